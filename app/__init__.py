@@ -1,5 +1,6 @@
 # app/__init__.py - Fixed version
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, has_app_context
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
@@ -9,9 +10,18 @@ from flask_socketio import SocketIO
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_caching import Cache
+from flask_compress import Compress
+from flask_jwt_extended import JWTManager
 from celery import Celery
+import redis
+from jinja2 import FileSystemBytecodeCache
 import os
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json still works
+    orjson = None
+
 # Initialize extensions
 db = SQLAlchemy()
 migrate = Migrate()
@@ -23,16 +33,88 @@ limiter = Limiter(
     key_func=get_remote_address, default_limits=["200 per day", "50 per hour"]
 )
 cache = Cache()
+compress = Compress()
+jwt = JWTManager()
+# Shared Redis client with a pooled connection so per-request lookups
+# (e.g. the JWT blocklist) reuse sockets instead of reconnecting
+redis_client = redis.Redis(
+    connection_pool=redis.ConnectionPool.from_url(
+        os.environ.get("REDIS_URL", "redis://localhost:6379/0"), max_connections=50
+    )
+)
 celery = Celery(
-    __name__, broker=os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+    __name__,
+    broker=os.environ.get("REDIS_URL", "redis://localhost:6379/0"),
+    # The worker starts with `celery -A app.celery`, which imports only
+    # this package; list the task modules here so they register on the
+    # worker too (the web process reaches them through the blueprints)
+    include=["app.notifications", "app.admin_utils", "mobile_api.auth"],
 )
 
 
+class FlaskTask(celery.Task):
+    """Base task that runs inside a Flask application context.
+
+    The tasks use current_app, templates and db.session, but the worker
+    process never calls create_app; a lazily-built app pushed per call
+    provides the context. Must be installed before the task modules are
+    imported so every task picks it up as its base.
+    """
+
+    _flask_app = None
+
+    def __call__(self, *args, **kwargs):
+        if has_app_context():
+            return self.run(*args, **kwargs)
+        if FlaskTask._flask_app is None:
+            FlaskTask._flask_app = create_app(
+                os.environ.get("FLASK_CONFIG", "production")
+            )
+        with FlaskTask._flask_app.app_context():
+            return self.run(*args, **kwargs)
+
+
+celery.Task = FlaskTask
+
+# Beat runs as `celery -A app.celery beat` and never calls create_app,
+# so the schedule must live at module level to be seen at all
+celery.conf.beat_schedule = {
+    "refresh-dashboard-view": {
+        "task": "admin.refresh_dashboard_view",
+        "schedule": 300,  # every 5 minutes
+    },
+    "flush-last-logins": {
+        "task": "auth.flush_last_logins",
+        "schedule": 30,  # coalesced login-timestamp writes
+    },
+}
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson's C encoder
+
+    jsonify responses dominate CPU on the mobile endpoints; orjson
+    serializes them several times faster than stdlib json and handles
+    datetimes natively.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj, option=orjson.OPT_NAIVE_UTC, default=self.default
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 def create_app(config_name="development"):
     """Create Flask application"""
 
     app = Flask(__name__)
 
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
     # Import config
     from config import DevelopmentConfig, ProductionConfig, TestingConfig
 
@@ -59,12 +141,37 @@ def create_app(config_name="development"):
     socketio.init_app(app, cors_allowed_origins="*", async_mode="threading")
     limiter.init_app(app)
     cache.init_app(app)
+    jwt.init_app(app)
+
+    # Compress JSON/HTML responses; the mobile booking payloads are
+    # key-heavy JSON that shrinks several-fold, and brotli quality 4
+    # keeps the CPU cost negligible. Tiny responses aren't worth the
+    # header overhead.
+    app.config.setdefault("COMPRESS_ALGORITHM", ["br", "gzip"])
+    app.config.setdefault("COMPRESS_MIN_SIZE", 512)
+    app.config.setdefault("COMPRESS_LEVEL", 6)
+    app.config.setdefault("COMPRESS_BR_LEVEL", 4)
+    compress.init_app(app)
+
+    # Cache compiled templates on disk so the compile cost is paid once
+    # across workers and restarts; skip mtime checks outside debug mode
+    cache_dir = os.path.join(app.root_path, "..", ".jinja_cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    if not app.debug:
+        app.jinja_env.auto_reload = False
 
     # Setup login manager
     login_manager.login_view = "auth.login"
     login_manager.login_message_category = "info"
     login_manager.session_protection = "strong"
 
+    # Mobile clients are inconsistent about trailing slashes; answering
+    # both forms directly avoids a 308 redirect round-trip per mismatch
+    # (must be set before any rule is added)
+    app.url_map.strict_slashes = False
+    app.url_map.merge_slashes = True
+
     # Register blueprints
     register_blueprints(app)
 
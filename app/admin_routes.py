@@ -7,9 +7,11 @@ from flask import (
     url_for,
     flash,
     send_file,
+    Response,
+    stream_with_context,
 )
 from flask_login import login_required, current_user
-from app import db
+from app import db, redis_client
 from app.models import (
     User,
     Tutor,
@@ -29,6 +31,7 @@ from app.admin_utils import (
     get_admin_stats,
     get_chart_data,
     export_data,
+    gzip_stream,
 )
 from app.forms import (
     UserProfileForm,
@@ -37,6 +40,8 @@ from app.forms import (
     PlatformSettingForm,
 )
 from app.notifications import PushNotificationService
+import hashlib
+import threading
 from datetime import datetime, timedelta
 from urllib.parse import urlparse  # Python's built-in (works great!)
 
@@ -89,16 +94,38 @@ def dashboard():
     )
 
 
+# Serializes stats regeneration on cache expiry so a burst of admins
+# refreshing at once doesn't recompute the aggregates N times in parallel
+_stats_regen_lock = threading.Lock()
+
+
 @admin.route("/dashboard/stats")
 @login_required
 @admin_required
 def dashboard_stats():
     """Get dashboard statistics (AJAX)"""
     period = request.args.get("period", "week")
-    stats = get_admin_stats()
-    chart_data = get_chart_data(period)
 
-    return jsonify({"success": True, "stats": stats, "chart_data": chart_data})
+    # Both helpers are memoized, so building the payload is cheap; hash
+    # it for the validator rather than guessing at freshness from a
+    # couple of table ids (which missed user/booking/ticket changes)
+    with _stats_regen_lock:
+        stats = get_admin_stats()
+        chart_data = get_chart_data(period)
+    payload = {"success": True, "stats": stats, "chart_data": chart_data}
+    body = json.dumps(payload, sort_keys=True, default=str)
+    etag = hashlib.blake2b(body.encode(), digest_size=8).hexdigest()
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(payload)
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = (
+        "private, max-age=30, stale-while-revalidate=60"
+    )
+    return response
 
 
 # ====================
@@ -220,6 +247,11 @@ def update_user(user_id):
 
     db.session.commit()
 
+    if "is_active" in data:
+        # Drop the cached password version so the mobile token-refresh
+        # fast path falls back to the DB and sees the new active flag
+        redis_client.delete(f"pwv:{user_id}")
+
     # Send notification to user
     if "is_active" in data and not data["is_active"]:
         PushNotificationService.send_email_notification(
@@ -246,7 +278,11 @@ def delete_user(user_id):
 
     # Log action before deletion
     log_admin_action(
-        "delete_user", "user", user_id, {"username": user.username, "email": user.email}
+        "delete_user",
+        "user",
+        user_id,
+        {"username": user.username, "email": user.email},
+        urgent=True,
     )
 
     # Soft delete (deactivate) instead of hard delete
@@ -256,9 +292,31 @@ def delete_user(user_id):
 
     db.session.commit()
 
+    # Force mobile token refreshes through the DB inactive check
+    redis_client.delete(f"pwv:{user_id}")
+
     return jsonify({"success": True, "message": "User deactivated successfully"})
 
 
+def _csv_export_response(data, filename):
+    """Stream a CSV row generator, gzip-compressed when the client accepts it
+
+    export_data returns a row generator - stream it instead of buffering
+    the whole export in memory.
+    """
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+
+    if "gzip" in request.accept_encodings:
+        headers["Content-Encoding"] = "gzip"
+        data = gzip_stream(data)
+
+    return Response(
+        stream_with_context(data),
+        mimetype="text/csv",
+        headers=headers,
+    )
+
+
 @admin.route("/users/export")
 @login_required
 @admin_required
@@ -275,12 +333,8 @@ def export_users():
     data = export_data("users", format, filters)
 
     if format == "csv":
-        return send_file(
-            BytesIO(data.encode()),
-            mimetype="text/csv",
-            as_attachment=True,
-            download_name=f"users_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-        )
+        filename = f"users_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        return _csv_export_response(data, filename)
     else:
         return jsonify(json.loads(data))
 
@@ -885,6 +939,7 @@ def refund_payment(payment_id):
         "payment",
         payment_id,
         {"refund_amount": amount, "reason": reason},
+        urgent=True,
     )
 
     db.session.commit()
@@ -1248,6 +1303,7 @@ def delete_announcement(announcement_id):
         "announcement",
         announcement_id,
         {"title": announcement.title},
+        urgent=True,
     )
 
     db.session.delete(announcement)
@@ -1444,12 +1500,8 @@ def export_data_route(export_type):
     data = export_data(export_type, format, filters)
 
     if format == "csv":
-        return send_file(
-            BytesIO(data.encode()),
-            mimetype="text/csv",
-            as_attachment=True,
-            download_name=f"{export_type}_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-        )
+        filename = f"{export_type}_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        return _csv_export_response(data, filename)
     elif format == "json":
         return send_file(
             BytesIO(data.encode()),
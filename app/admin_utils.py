@@ -1,7 +1,32 @@
+import csv
+import gzip
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from functools import wraps
+from io import BytesIO, StringIO
 from flask import abort, jsonify, request, current_app
 from flask_login import current_user
-import json
+from sqlalchemy import func, and_, or_, case, text, select, insert, literal
+from sqlalchemy.orm import joinedload
+from app import cache, celery
+from app.models import (
+    User, Tutor, Booking, Payment, Review, SupportTicket,
+    AdminAuditLog, PlatformSetting, db
+)
+
+try:
+    import orjson
+except ImportError:  # optional C-accelerated serializer
+    orjson = None
+
+def _json_dumps(obj):
+    """Serialize with orjson when available, stdlib json otherwise"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
 
 def admin_required(f):
     """Decorator to restrict access to admins only"""
@@ -25,369 +50,183 @@ def super_admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def log_admin_action(action, resource_type=None, resource_id=None, details=None):
-    """Log admin actions for audit trail"""
-    from app.models import AdminAuditLog, db
-    
-    log = AdminAuditLog(
-        admin_id=current_user.id,
-        action=action,
-        resource_type=resource_type,
-        resource_id=resource_id,
-        details=json.dumps(details) if details else None,
-        ip_address=request.remote_addr,
-        user_agent=request.user_agent.string
-    )
-    
-    db.session.add(log)
-    db.session.commit()
-
-def get_admin_stats():
-    """Get dashboard statistics for admin"""
-    from app.models import User, Tutor, Booking, Payment, SupportTicket, db
-    from datetime import datetime, timedelta
-    
-    today = datetime.utcnow().date()
-    week_ago = today - timedelta(days=7)
-    month_ago = today - timedelta(days=30)
-    
-    # User statistics
-    total_users = User.query.count()
-    new_users_today = User.query.filter(
-        db.func.date(User.created_at) == today
-    ).count()
-    new_users_week = User.query.filter(
-        User.created_at >= week_ago
-    ).count()
-    
-    # Tutor statistics
-    total_tutors = Tutor.query.count()
-    pending_tutors = Tutor.query.filter_by(is_verified=False).count()
-    new_tutors_week = Tutor.query.filter(
-        Tutor.created_at >= week_ago
-    ).count()
-    
-    # Booking statistics
-    total_bookings = Booking.query.count()
-    today_bookings = Booking.query.filter(
-        db.func.date(Booking.created_at) == today
-    ).count()
-    week_bookings = Booking.query.filter(
-        Booking.created_at >= week_ago
-    ).count()
-    
-    # Financial statistics
-    total_revenue = db.session.query(db.func.sum(Payment.amount)).filter(
-        Payment.status == 'completed'
-    ).scalar() or 0
-    
-    today_revenue = db.session.query(db.func.sum(Payment.amount)).filter(
-        Payment.status == 'completed',
-        db.func.date(Payment.created_at) == today
-    ).scalar() or 0
-    
-    week_revenue = db.session.query(db.func.sum(Payment.amount)).filter(
-        Payment.status == 'completed',
-        Payment.created_at >= week_ago
-    ).scalar() or 0
-    
-    # Support statistics
-    open_tickets = SupportTicket.query.filter_by(status='open').count()
-    urgent_tickets = SupportTicket.query.filter_by(priority='urgent', status='open').count()
-    
-    # Platform metrics
-    completion_rate = 0
-    if total_bookings > 0:
-        completed_bookings = Booking.query.filter_by(status='completed').count()
-        completion_rate = (completed_bookings / total_bookings) * 100
-    
-    average_rating = db.session.query(db.func.avg(Tutor.rating)).scalar() or 0
-    
-    return {
-        'users': {
-            'total': total_users,
-            'today': new_users_today,
-            'week': new_users_week,
-            'students': User.query.filter_by(user_type='student').count(),
-            'tutors': total_tutors,
-            'parents': User.query.filter_by(user_type='parent').count(),
-            'admins': User.query.filter_by(user_type='admin').count()
-        },
-        'tutors': {
-            'total': total_tutors,
-            'pending_verification': pending_tutors,
-            'new_week': new_tutors_week,
-            'verified': Tutor.query.filter_by(is_verified=True).count(),
-            'featured': Tutor.query.filter_by(is_featured=True).count(),
-            'online': Tutor.query.filter_by(is_available=True).count()
-        },
-        'bookings': {
-            'total': total_bookings,
-            'today': today_bookings,
-            'week': week_bookings,
-            'pending': Booking.query.filter_by(status='pending').count(),
-            'confirmed': Booking.query.filter_by(status='confirmed').count(),
-            'completed': Booking.query.filter_by(status='completed').count(),
-            'cancelled': Booking.query.filter_by(status='cancelled').count()
-        },
-        'financial': {
-            'total_revenue': total_revenue,
-            'today_revenue': today_revenue,
-            'week_revenue': week_revenue,
-            'platform_fee': total_revenue * 0.15,  # 15% platform fee
-            'tutor_payouts': total_revenue * 0.85,
-            'pending_payouts': db.session.query(db.func.sum(Payment.amount)).filter(
-                Payment.status == 'pending'
-            ).scalar() or 0
-        },
-        'support': {
-            'open_tickets': open_tickets,
-            'urgent_tickets': urgent_tickets,
-            'total_tickets': SupportTicket.query.count(),
-            'resolved_today': SupportTicket.query.filter(
-                SupportTicket.status == 'resolved',
-                db.func.date(SupportTicket.resolved_at) == today
-            ).count()
-        },
-        'platform_metrics': {
-            'completion_rate': round(completion_rate, 1),
-            'average_rating': round(average_rating, 1),
-            'response_time': '2.5 hours',  # Mock data
-            'satisfaction_score': 4.5,  # Mock data
-            'active_users': User.query.filter(
-                User.last_login >= month_ago
-            ).count()
-        }
-    }
-
-def get_chart_data(period='week'):
-    """Get chart data for admin dashboard"""
-    from app.models import Booking, Payment, User, db
-    from datetime import datetime, timedelta
-    
-    if period == 'week':
-        days = 7
-    elif period == 'month':
-        days = 30
-    else:  # year
-        days = 365
-    
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
-    
-    dates = []
-    bookings_data = []
-    revenue_data = []
-    users_data = []
-    
-    for i in range(days):
-        date = start_date + timedelta(days=i)
-        date_str = date.strftime('%Y-%m-%d')
-        dates.append(date_str)
-        
-        # Get bookings for this day
-        bookings_count = Booking.query.filter(
-            db.func.date(Booking.created_at) == date.date()
-        ).count()
-        bookings_data.append(bookings_count)
-        
-        # Get revenue for this day
-        revenue = db.session.query(db.func.sum(Payment.amount)).filter(
-            Payment.status == 'completed',
-            db.func.date(Payment.created_at) == date.date()
-        ).scalar() or 0
-        revenue_data.append(float(revenue))
-        
-        # Get new users for this day
-        new_users = User.query.filter(
-            db.func.date(User.created_at) == date.date()
-        ).count()
-        users_data.append(new_users)
-    
-    return {
-        'dates': dates,
-        'bookings': bookings_data,
-        'revenue': revenue_data,
-        'users': users_data,
-        'period': period
-    }
-
-def export_data(resource_type, format='csv', filters=None):
-    """Export data in various formats"""
-    import csv
-    import json
-    from io import StringIO
-    from app.models import User, Tutor, Booking, Payment
-    
-    if resource_type == 'users':
-        query = User.query
-        if filters:
-            if filters.get('user_type'):
-                query = query.filter_by(user_type=filters['user_type'])
-            if filters.get('is_active') is not None:
-                query = query.filter_by(is_active=filters['is_active'])
-        data = query.all()
-        
-        if format == 'csv':
-            output = StringIO()
-            writer = csv.writer(output)
-            writer.writerow(['ID', 'Username', 'Email', 'Phone', 'User Type', 'Location', 'Created At'])
-            for user in data:
-                writer.writerow([
-                    user.id, user.username, user.email, user.phone,
-                    user.user_type, user.location, user.created_at
-                ])
-            return output.getvalue()
-        
-        elif format == 'json':
-            return json.dumps([{
-                'id': u.id,
-                'username': u.username,
-                'email': u.email,
-                'phone': u.phone,
-                'user_type': u.user_type,
-                'location': u.location,
-                'created_at': u.created_at.isoformat()
-            } for u in data], indent=2)
-    
-    elif resource_type == 'tutors':
-        query = Tutor.query.join(User)
-        if filters:
-            if filters.get('is_verified') is not None:
-                query = query.filter_by(is_verified=filters['is_verified'])
-            if filters.get('is_available') is not None:
-                query = query.filter_by(is_available=filters['is_available'])
-        data = query.all()
-        
-        if format == 'csv':
-            output = StringIO()
-            writer = csv.writer(output)
-            writer.writerow(['ID', 'Full Name', 'Email', 'Phone', 'Subjects', 'Rate', 'Rating', 'Verified', 'Created At'])
-            for tutor in data:
-                writer.writerow([
-                    tutor.id, tutor.full_name, tutor.user.email, tutor.user.phone,
-                    tutor.subjects, tutor.hourly_rate, tutor.rating,
-                    tutor.is_verified, tutor.created_at
-                ])
-            return output.getvalue()
-    
-    elif resource_type == 'bookings':
-        query = Booking.query
-        if filters:
-            if filters.get('status'):
-                query = query.filter_by(status=filters['status'])
-            if filters.get('date_from'):
-                query = query.filter(Booking.created_at >= filters['date_from'])
-            if filters.get('date_to'):
-                query = query.filter(Booking.created_at <= filters['date_to'])
-        data = query.all()
-        
-        if format == 'csv':
-            output = StringIO()
-            writer = csv.writer(output)
-            writer.writerow(['ID', 'Student', 'Tutor', 'Subject', 'Hours', 'Amount', 'Status', 'Created At'])
-            for booking in data:
-                writer.writerow([
-                    booking.id, booking.student.username, booking.tutor.full_name,
-                    booking.subject, booking.hours, booking.total_amount,
-                    booking.status, booking.created_at
-                ])
-            return output.getvalue()
-    
-    elif resource_type == 'payments':
-        query = Payment.query
-        if filters:
-            if filters.get('status'):
-                query = query.filter_by(status=filters['status'])
-        data = query.all()
-        
-        if format == 'csv':
-            output = StringIO()
-            writer = csv.writer(output)
-            writer.writerow(['ID', 'Booking ID', 'Amount', 'Status', 'M-Pesa Receipt', 'Phone', 'Created At'])
-            for payment in data:
-                writer.writerow([
-                    payment.id, payment.booking_id, payment.amount,
-                    payment.status, payment.mpesa_receipt or '',
-                    payment.phone_number or '', payment.created_at
-                ])
-            return output.getvalue()
-    
-    return None
-# admin_utils.py (additional functions)
-
-import csv
-import json
-from datetime import datetime, timedelta
-from flask import current_app
-from sqlalchemy import func, and_, or_
-from app.models import (
-    User, Tutor, Booking, Payment, Review, SupportTicket,
-    AdminAuditLog, PlatformSetting
-)
-
+@cache.memoize(timeout=60)
 def get_admin_stats():
     """Get admin dashboard statistics"""
     now = datetime.utcnow()
     last_week = now - timedelta(days=7)
     last_month = now - timedelta(days=30)
-    
+
+    # One conditional-aggregate query per table instead of one round trip
+    # per metric (~25 queries collapsed into 5).
+    user_stmt = select(
+        func.count().filter(User.is_active == True),
+        func.count().filter(User.user_type == 'student', User.is_active == True),
+        func.count().filter(User.created_at >= last_week, User.is_active == True),
+        func.count().filter(User.created_at >= last_month, User.is_active == True),
+    ).select_from(User)
+
+    tutor_stmt = select(
+        func.count(),
+        func.count().filter(Tutor.is_featured == True),
+        func.count().filter(Tutor.is_available == True),
+        func.avg(Tutor.rating).filter(Tutor.rating > 0),
+    ).select_from(Tutor)
+
+    booking_stmt = select(
+        func.count(),
+        func.count().filter(Booking.status == 'pending'),
+        func.count().filter(Booking.status == 'completed'),
+        func.count().filter(Booking.status == 'cancelled'),
+        func.count().filter(Booking.created_at >= last_week),
+        func.count().filter(Booking.created_at >= last_month),
+    ).select_from(Booking)
+
+    completed_payment = Payment.status == 'completed'
+    payment_stmt = select(
+        func.sum(case((completed_payment, Payment.amount), else_=0)),
+        func.count().filter(Payment.status == 'pending'),
+        func.sum(case(
+            (and_(completed_payment, Payment.created_at >= last_week), Payment.amount),
+            else_=0
+        )),
+        func.sum(case(
+            (and_(completed_payment, Payment.created_at >= last_month), Payment.amount),
+            else_=0
+        )),
+        func.sum(case((Payment.status == 'pending', Payment.amount), else_=0)),
+    ).select_from(Payment)
+
+    ticket_stmt = select(
+        func.count().filter(SupportTicket.status == 'open'),
+        func.count().filter(
+            SupportTicket.status == 'open', SupportTicket.priority == 'high'
+        ),
+    ).select_from(SupportTicket)
+
+    # The five aggregates are independent and latency-bound on the DB
+    # socket, so fan them out in parallel - each worker checks out its
+    # own connection from the engine pool.
+    engine = db.engine
+
+    def run_aggregate(stmt):
+        with engine.connect() as conn:
+            return conn.execute(stmt).one()
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        user_row, tutor_row, booking_row, payment_row, ticket_row = list(
+            executor.map(
+                run_aggregate,
+                [user_stmt, tutor_stmt, booking_stmt, payment_stmt, ticket_stmt],
+            )
+        )
+
     stats = {
         # User statistics
-        'total_users': User.query.filter_by(is_active=True).count(),
-        'total_tutors': Tutor.query.filter_by(is_verified=True).count(),
-        'total_students': User.query.filter_by(user_type='student', is_active=True).count(),
-        'new_users_week': User.query.filter(
-            User.created_at >= last_week,
-            User.is_active == True
-        ).count(),
-        'new_users_month': User.query.filter(
-            User.created_at >= last_month,
-            User.is_active == True
-        ).count(),
-        
+        'total_users': user_row[0],
+        'total_tutors': tutor_row[0],
+        'total_students': user_row[1],
+        'new_users_week': user_row[2],
+        'new_users_month': user_row[3],
+
         # Booking statistics
-        'total_bookings': Booking.query.count(),
-        'pending_bookings': Booking.query.filter_by(status='pending').count(),
-        'completed_bookings': Booking.query.filter_by(status='completed').count(),
-        'cancelled_bookings': Booking.query.filter_by(status='cancelled').count(),
-        'weekly_bookings': Booking.query.filter(Booking.created_at >= last_week).count(),
-        'monthly_bookings': Booking.query.filter(Booking.created_at >= last_month).count(),
-        
+        'total_bookings': booking_row[0],
+        'pending_bookings': booking_row[1],
+        'completed_bookings': booking_row[2],
+        'cancelled_bookings': booking_row[3],
+        'weekly_bookings': booking_row[4],
+        'monthly_bookings': booking_row[5],
+
         # Payment statistics
-        'total_revenue': db.session.query(func.sum(Payment.amount)).filter(
-            Payment.status == 'completed'
-        ).scalar() or 0,
-        'pending_payments': Payment.query.filter_by(status='pending').count(),
-        'weekly_revenue': db.session.query(func.sum(Payment.amount)).filter(
-            Payment.status == 'completed',
-            Payment.created_at >= last_week
-        ).scalar() or 0,
-        'monthly_revenue': db.session.query(func.sum(Payment.amount)).filter(
-            Payment.status == 'completed',
-            Payment.created_at >= last_month
-        ).scalar() or 0,
-        
+        'total_revenue': payment_row[0] or 0,
+        'pending_payments': payment_row[1],
+        'weekly_revenue': payment_row[2] or 0,
+        'monthly_revenue': payment_row[3] or 0,
+        'pending_payouts': payment_row[4] or 0,
+        'platform_fee': (payment_row[0] or 0) * 0.15,
+        'tutor_payouts': (payment_row[0] or 0) * 0.85,
+
         # Support statistics
-        'open_tickets': SupportTicket.query.filter_by(status='open').count(),
-        'high_priority_tickets': SupportTicket.query.filter_by(
-            status='open', priority='high'
-        ).count(),
-        
+        'open_tickets': ticket_row[0],
+        'high_priority_tickets': ticket_row[1],
+
         # Platform statistics
-        'average_tutor_rating': db.session.query(func.avg(Tutor.rating)).filter(
-            Tutor.rating > 0
-        ).scalar() or 0,
-        'featured_tutors': Tutor.query.filter_by(is_featured=True).count(),
-        'available_tutors': Tutor.query.filter_by(is_available=True).count(),
+        'average_tutor_rating': tutor_row[3] or 0,
+        'featured_tutors': tutor_row[1],
+        'available_tutors': tutor_row[2],
     }
-    
+
     # Format numbers
     if stats['average_tutor_rating']:
         stats['average_tutor_rating'] = round(stats['average_tutor_rating'], 1)
-    
+
     return stats
 
+def _daily_rollups(window_start):
+    """Get per-day (bookings, revenue, users) dicts for the chart window.
+
+    On Postgres the precomputed mv_daily_dashboard materialized view is
+    read with a single range SELECT; elsewhere (or before the view has
+    been created) fall back to live GROUP BY aggregation. Keeping the
+    range filter on the raw created_at column (not func.date) lets the
+    planner use an index scan over the window.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        try:
+            rows = db.session.execute(
+                text(
+                    'SELECT day, bookings, revenue, users '
+                    'FROM mv_daily_dashboard WHERE day >= :start'
+                ),
+                {'start': window_start},
+            ).fetchall()
+        except Exception:
+            # View not created yet (migration not run) - aggregate live
+            db.session.rollback()
+        else:
+            booking_rows = {row[0].date(): row[1] for row in rows}
+            revenue_rows = {row[0].date(): row[2] for row in rows}
+            user_rows = {row[0].date(): row[3] for row in rows}
+            return booking_rows, revenue_rows, user_rows
+
+    booking_day = func.date(Booking.created_at)
+    booking_rows = dict(
+        db.session.query(booking_day, func.count())
+        .filter(Booking.created_at >= window_start)
+        .group_by(booking_day)
+        .all()
+    )
+
+    payment_day = func.date(Payment.created_at)
+    revenue_rows = dict(
+        db.session.query(payment_day, func.sum(Payment.amount))
+        .filter(Payment.status == 'completed', Payment.created_at >= window_start)
+        .group_by(payment_day)
+        .all()
+    )
+
+    user_day = func.date(User.created_at)
+    user_rows = dict(
+        db.session.query(user_day, func.count())
+        .filter(User.created_at >= window_start)
+        .group_by(user_day)
+        .all()
+    )
+
+    return booking_rows, revenue_rows, user_rows
+
+@celery.task(name='admin.refresh_dashboard_view')
+def refresh_dashboard_view():
+    """Refresh mv_daily_dashboard; scheduled via Celery beat"""
+    if db.engine.dialect.name != 'postgresql':
+        return
+
+    db.session.execute(
+        text('REFRESH MATERIALIZED VIEW CONCURRENTLY mv_daily_dashboard')
+    )
+    db.session.commit()
+
+@cache.memoize(timeout=60)
 def get_chart_data(period='week'):
     """Get chart data for dashboard"""
     now = datetime.utcnow()
@@ -402,52 +241,27 @@ def get_chart_data(period='week'):
         days = 7
         date_format = '%a'
     
+    window_start = (now - timedelta(days=days - 1)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+
     # Generate dates
-    dates = []
-    for i in range(days - 1, -1, -1):
-        date = now - timedelta(days=i)
-        dates.append(date.strftime(date_format))
-    
-    # Get bookings data
-    bookings_data = []
-    for i in range(days - 1, -1, -1):
-        start_date = (now - timedelta(days=i)).replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=1)
-        
-        count = Booking.query.filter(
-            Booking.created_at >= start_date,
-            Booking.created_at < end_date
-        ).count()
-        
-        bookings_data.append(count)
-    
-    # Get revenue data
-    revenue_data = []
-    for i in range(days - 1, -1, -1):
-        start_date = (now - timedelta(days=i)).replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=1)
-        
-        revenue = db.session.query(func.sum(Payment.amount)).filter(
-            Payment.status == 'completed',
-            Payment.created_at >= start_date,
-            Payment.created_at < end_date
-        ).scalar() or 0
-        
-        revenue_data.append(float(revenue))
-    
-    # Get user registrations
-    users_data = []
-    for i in range(days - 1, -1, -1):
-        start_date = (now - timedelta(days=i)).replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=1)
-        
-        count = User.query.filter(
-            User.created_at >= start_date,
-            User.created_at < end_date
-        ).count()
-        
-        users_data.append(count)
-    
+    day_keys = [(window_start + timedelta(days=i)).date() for i in range(days)]
+    dates = [day.strftime(date_format) for day in day_keys]
+
+    booking_rows, revenue_rows, user_rows = _daily_rollups(window_start)
+
+    def day_value(rows, day):
+        # Postgres returns date buckets as date objects, SQLite as strings
+        value = rows.get(day)
+        if value is None:
+            value = rows.get(day.isoformat())
+        return value or 0
+
+    bookings_data = [day_value(booking_rows, day) for day in day_keys]
+    revenue_data = [float(day_value(revenue_rows, day)) for day in day_keys]
+    users_data = [day_value(user_rows, day) for day in day_keys]
+
     return {
         'labels': dates,
         'bookings': bookings_data,
@@ -457,136 +271,227 @@ def get_chart_data(period='week'):
     }
 
 def export_data(data_type, format='csv', filters=None):
-    """Export data to CSV or JSON"""
+    """Export data to CSV or JSON
+
+    Each export selects only the projected columns with explicit joins
+    instead of hydrating full ORM entities, so large unused columns
+    (bios, password hashes) never leave the database.
+    """
     filters = filters or {}
-    
+
     if data_type == 'users':
-        query = User.query
-        
+        fields = ['id', 'username', 'email', 'phone', 'user_type', 'is_active',
+                 'is_verified', 'created_at']
+        stmt = select(
+            User.id, User.username, User.email, User.phone, User.user_type,
+            User.is_active, User.is_verified, User.created_at
+        )
+
         if 'user_type' in filters:
-            query = query.filter_by(user_type=filters['user_type'])
+            stmt = stmt.where(User.user_type == filters['user_type'])
         if 'is_active' in filters:
-            query = query.filter_by(is_active=filters['is_active'])
-        
-        data = query.all()
-        fields = ['id', 'username', 'email', 'phone', 'user_type', 'is_active', 
-                 'is_verified', 'created_at']
-        
+            stmt = stmt.where(User.is_active == filters['is_active'])
+
     elif data_type == 'tutors':
-        query = Tutor.query.join(User)
-        
-        if 'is_verified' in filters:
-            query = query.filter_by(is_verified=filters['is_verified'])
-        
-        data = query.all()
         fields = ['id', 'full_name', 'user.email', 'subjects', 'education_level',
-                 'rating', 'hourly_rate', 'is_verified', 'is_featured', 
-                 'is_available', 'created_at']
-        
+                 'rating', 'hourly_rate', 'is_featured', 'is_available',
+                 'created_at']
+        stmt = select(
+            Tutor.id, Tutor.full_name, User.email.label('user.email'),
+            Tutor.subjects, Tutor.level.label('education_level'),
+            Tutor.rating, Tutor.hourly_rate, Tutor.is_featured,
+            Tutor.is_available, Tutor.created_at
+        ).join(User, Tutor.user_id == User.id)
+
     elif data_type == 'bookings':
-        query = Booking.query
-        
-        if 'status' in filters:
-            query = query.filter_by(status=filters['status'])
-        
-        data = query.all()
         fields = ['id', 'student.username', 'tutor.full_name', 'subject',
                  'duration_hours', 'total_amount', 'status', 'booking_date',
                  'created_at']
-        
-    elif data_type == 'payments':
-        query = Payment.query
-        
+        stmt = select(
+            Booking.id, User.username.label('student.username'),
+            Tutor.full_name.label('tutor.full_name'), Booking.subject,
+            Booking.hours.label('duration_hours'), Booking.total_amount,
+            Booking.status, Booking.schedule_date.label('booking_date'),
+            Booking.created_at
+        ).join(User, Booking.student_id == User.id).join(
+            Tutor, Booking.tutor_id == Tutor.id
+        )
+
         if 'status' in filters:
-            query = query.filter_by(status=filters['status'])
-        
-        data = query.all()
+            stmt = stmt.where(Booking.status == filters['status'])
+
+    elif data_type == 'payments':
         fields = ['id', 'transaction_id', 'user.username', 'amount', 'currency',
                  'payment_method', 'status', 'created_at']
-        
+        stmt = select(
+            Payment.id, Payment.mpesa_code.label('transaction_id'),
+            User.username.label('user.username'), Payment.amount,
+            literal('KES').label('currency'),
+            literal('mpesa').label('payment_method'),
+            Payment.status, Payment.created_at
+        ).join(Booking, Payment.booking_id == Booking.id).join(
+            User, Booking.student_id == User.id
+        )
+
+        if 'status' in filters:
+            stmt = stmt.where(Payment.status == filters['status'])
+
     elif data_type == 'reviews':
-        query = Review.query
-        data = query.all()
         fields = ['id', 'student.username', 'tutor.full_name', 'rating',
                  'comment', 'created_at']
-    
+        stmt = select(
+            Review.id, User.username.label('student.username'),
+            Tutor.full_name.label('tutor.full_name'), Review.rating,
+            Review.comment, Review.created_at
+        ).join(User, Review.author_id == User.id).join(
+            Tutor, Review.tutor_id == Tutor.id
+        )
+
     else:
         raise ValueError(f"Unsupported data type: {data_type}")
-    
+
     # Convert to requested format
     if format == 'csv':
-        return convert_to_csv(data, fields)
+        # Stream row batches instead of buffering the whole export
+        return iter_csv(stmt, fields)
     elif format == 'json':
-        return convert_to_json(data, fields)
+        return convert_to_json(db.session.execute(stmt).all(), fields)
     else:
         raise ValueError(f"Unsupported format: {format}")
 
-def convert_to_csv(data, fields):
-    """Convert data to CSV format"""
-    output = BytesIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow(fields)
-    
-    # Write data
-    for item in data:
-        row = []
-        for field in fields:
-            if '.' in field:
-                # Handle nested fields (e.g., 'user.email')
-                parts = field.split('.')
-                value = item
-                for part in parts:
-                    value = getattr(value, part, '')
-                row.append(str(value) if value is not None else '')
-            else:
-                value = getattr(item, field, '')
-                if isinstance(value, datetime):
-                    row.append(value.isoformat())
-                else:
-                    row.append(str(value) if value is not None else '')
-        
+def _format_csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def iter_csv(stmt, fields):
+    """Stream query results as CSV lines
+
+    Yields one CSV line at a time so the route can return a streaming
+    response; rows are fetched in batches via yield_per instead of
+    materializing the whole result set.
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    def render_row(row):
         writer.writerow(row)
-    
-    return output.getvalue().decode('utf-8')
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return line
+
+    # Write header
+    yield render_row(fields)
+
+    # Write data; columns are selected in field order
+    result = db.session.execute(stmt.execution_options(yield_per=1000))
+    for row in result:
+        yield render_row([_format_csv_value(value) for value in row])
+
+def gzip_stream(lines):
+    """Compress an iterable of text lines into gzip chunks
 
-def convert_to_json(data, fields):
+    Text-heavy CSV compresses 5-10x, so compressing at the edge of the
+    stream cuts outgoing bandwidth on large exports while still never
+    buffering the whole file.
+    """
+    buffer = BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as gz:
+        for line in lines:
+            gz.write(line.encode('utf-8'))
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+    yield buffer.getvalue()
+
+def convert_to_json(rows, fields):
     """Convert data to JSON format"""
     result = []
-    
-    for item in data:
-        obj = {}
-        for field in fields:
-            if '.' in field:
-                parts = field.split('.')
-                value = item
-                for part in parts:
-                    value = getattr(value, part, None)
-            else:
-                value = getattr(item, field, None)
-            
-            # Convert datetime to ISO format
-            if isinstance(value, datetime):
-                value = value.isoformat()
-            
-            obj[field] = value
-        
+
+    for row in rows:
+        obj = dict(zip(fields, row))
+
+        # orjson serializes datetime natively; only stringify for
+        # the stdlib fallback
+        if orjson is None:
+            for key, value in obj.items():
+                if isinstance(value, datetime):
+                    obj[key] = value.isoformat()
+
         result.append(obj)
-    
-    return json.dumps(result, indent=2)
-
-def log_admin_action(action, resource_type, resource_id, details=None):
-    """Log admin action to audit log"""
-    audit_log = AdminAuditLog(
-        admin_id=current_user.id,
-        action=action,
-        resource_type=resource_type,
-        resource_id=resource_id,
-        details=details or {},
-        ip_address=request.remote_addr,
-        user_agent=request.user_agent.string
-    )
-    
-    db.session.add(audit_log)
-    db.session.commit()
\ No newline at end of file
+
+    if orjson is not None:
+        return orjson.dumps(
+            result, option=orjson.OPT_INDENT_2 | orjson.OPT_NAIVE_UTC
+        ).decode()
+    return json.dumps(result, indent=2, default=str)
+
+# Non-urgent audit rows are buffered and bulk-inserted so burst admin
+# traffic pays one executemany instead of one insert per click
+_audit_buffer = []
+_audit_lock = threading.Lock()
+_audit_last_flush = time.monotonic()
+AUDIT_FLUSH_ROWS = 500
+AUDIT_FLUSH_SECONDS = 1.0
+
+def flush_audit_logs(force=False):
+    """Bulk-insert buffered audit rows once a size or age threshold hits"""
+    global _audit_last_flush
+
+    with _audit_lock:
+        due = (
+            len(_audit_buffer) >= AUDIT_FLUSH_ROWS
+            or time.monotonic() - _audit_last_flush >= AUDIT_FLUSH_SECONDS
+        )
+        if not _audit_buffer or not (force or due):
+            return
+        rows = list(_audit_buffer)
+        _audit_buffer.clear()
+        _audit_last_flush = time.monotonic()
+
+    with db.engine.begin() as conn:
+        conn.execute(insert(AdminAuditLog), rows)
+
+def log_admin_action(action, resource_type, resource_id, details=None,
+                     urgent=False):
+    """Log admin action to audit log
+
+    Urgent actions (e.g. deleting a user) are added to the caller's
+    session so they persist atomically with the mutation; everything else
+    goes through the batched buffer.
+    """
+    if urgent:
+        audit_log = AdminAuditLog(
+            admin_id=current_user.id,
+            action=action,
+            resource_type=resource_type,
+            resource_id=resource_id,
+            details=_json_dumps(details) if details else None,
+            ip_address=request.remote_addr,
+            user_agent=request.user_agent.string
+        )
+        db.session.add(audit_log)
+    else:
+        row = {
+            'admin_id': current_user.id,
+            'action': action,
+            'resource_type': resource_type,
+            'resource_id': resource_id,
+            'details': _json_dumps(details) if details else None,
+            'ip_address': request.remote_addr,
+            'user_agent': request.user_agent.string,
+            'created_at': datetime.utcnow(),
+        }
+        with _audit_lock:
+            _audit_buffer.append(row)
+        flush_audit_logs()
+
+    # Admin actions on these resources change the dashboard numbers, so
+    # drop the memoized stats rather than serving them stale for the TTL.
+    if resource_type in ('user', 'tutor', 'booking', 'payment', 'ticket'):
+        cache.delete_memoized(get_admin_stats)
+        cache.delete_memoized(get_chart_data)
\ No newline at end of file
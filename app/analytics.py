@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
-from app import db
-from app.models import Booking, Tutor, User, Payment
+from sqlalchemy import func, case, event
+from app import cache, db
+from app.models import Booking, Review, Tutor, User, Payment
 import pandas as pd
 import plotly.graph_objs as go
 import plotly.utils
@@ -8,6 +9,7 @@ import json
 
 class AnalyticsEngine:
     @staticmethod
+    @cache.memoize(timeout=300)
     def get_tutor_analytics(tutor_id, period='month'):
         """Get detailed analytics for a tutor"""
         tutor = Tutor.query.get(tutor_id)
@@ -22,39 +24,48 @@ class AnalyticsEngine:
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         
-        # Get bookings data
-        bookings = Booking.query.filter(
+        # Fetch the window once as a DataFrame; every sub-metric below is
+        # a vectorized aggregation on it instead of a separate query or
+        # per-row Python loop
+        window_query = Booking.query.filter(
             Booking.tutor_id == tutor_id,
             Booking.created_at >= start_date,
             Booking.created_at <= end_date
-        ).all()
-        
+        ).with_entities(
+            Booking.status,
+            Booking.total_amount,
+            Booking.schedule_time,
+            Booking.student_id
+        )
+        df = pd.read_sql(window_query.statement, db.engine)
+
         # Calculate metrics
-        total_bookings = len(bookings)
-        completed_bookings = len([b for b in bookings if b.status == 'completed'])
-        cancelled_bookings = len([b for b in bookings if b.status == 'cancelled'])
-        pending_bookings = len([b for b in bookings if b.status == 'pending'])
-        
+        status_counts = df['status'].value_counts()
+        total_bookings = int(len(df))
+        completed_bookings = int(status_counts.get('completed', 0))
+        cancelled_bookings = int(status_counts.get('cancelled', 0))
+
         # Calculate earnings
-        earnings = sum([b.total_amount for b in bookings if b.status == 'completed'])
-        
-        # Get hourly distribution
+        completed = df[df['status'] == 'completed']
+        earnings = float(completed['total_amount'].sum())
+
+        # Get hourly distribution; splitting on ':' keeps unpadded times
+        # like '9:00' in the right bucket
+        if len(completed):
+            hours = completed['schedule_time'].str.split(':').str[0].astype(int)
+            hour_counts = hours.value_counts()
+        else:
+            hour_counts = pd.Series(dtype=int)
+
         hourly_data = {}
         for hour in range(8, 22):  # 8 AM to 10 PM
-            hourly_data[f'{hour}:00'] = len([
-                b for b in bookings 
-                if b.status == 'completed' and 
-                int(b.schedule_time.split(':')[0]) == hour
-            ])
-        
+            hourly_data[f'{hour}:00'] = int(hour_counts.get(hour, 0))
+
         # Student retention rate
-        unique_students = len(set([b.student_id for b in bookings]))
-        repeat_students = len([
-            student_id for student_id in 
-            [b.student_id for b in bookings]
-            if [b.student_id for b in bookings].count(student_id) > 1
-        ])
-        
+        bookings_per_student = df['student_id'].value_counts()
+        unique_students = int(len(bookings_per_student))
+        repeat_students = int((bookings_per_student > 1).sum())
+
         retention_rate = (repeat_students / unique_students * 100) if unique_students > 0 else 0
         
         return {
@@ -76,37 +87,61 @@ class AnalyticsEngine:
     @staticmethod
     def _get_subject_popularity(tutor_id):
         """Get subject popularity analysis"""
-        bookings = Booking.query.filter_by(tutor_id=tutor_id).all()
-        
-        subject_counts = {}
-        for booking in bookings:
-            subject = booking.subject
-            subject_counts[subject] = subject_counts.get(subject, 0) + 1
-        
-        return sorted(subject_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+        count = func.count().label('count')
+        rows = (
+            db.session.query(Booking.subject, count)
+            .filter(Booking.tutor_id == tutor_id)
+            .group_by(Booking.subject)
+            .order_by(count.desc())
+            .limit(5)
+            .all()
+        )
+        return [(subject, subject_count) for subject, subject_count in rows]
     
     @staticmethod
     def _get_trend_data(tutor_id, days):
         """Get booking trends over time"""
+        now = datetime.utcnow()
+        window_start = (now - timedelta(days=days)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+
+        # One date-bucketed aggregate over the window instead of fetching
+        # every booking for every day separately
+        day_bucket = func.date(Booking.created_at)
+        rows = (
+            db.session.query(
+                day_bucket,
+                func.count(),
+                func.sum(case(
+                    (Booking.status == 'completed', Booking.total_amount),
+                    else_=0
+                )),
+            )
+            .filter(
+                Booking.tutor_id == tutor_id,
+                Booking.created_at >= window_start
+            )
+            .group_by(day_bucket)
+            .all()
+        )
+
+        by_day = {}
+        for day, count, earned in rows:
+            key = day if isinstance(day, str) else day.isoformat()
+            by_day[key] = (count, float(earned or 0))
+
         dates = []
         bookings_count = []
         earnings_data = []
-        
+
         for i in range(days, 0, -1):
-            date = datetime.utcnow() - timedelta(days=i)
-            start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_of_day = date.replace(hour=23, minute=59, second=59, microsecond=999999)
-            
-            daily_bookings = Booking.query.filter(
-                Booking.tutor_id == tutor_id,
-                Booking.created_at >= start_of_day,
-                Booking.created_at <= end_of_day
-            ).all()
-            
-            dates.append(date.strftime('%Y-%m-%d'))
-            bookings_count.append(len(daily_bookings))
-            earnings_data.append(sum([b.total_amount for b in daily_bookings if b.status == 'completed']))
-        
+            key = (now - timedelta(days=i)).strftime('%Y-%m-%d')
+            count, earned = by_day.get(key, (0, 0.0))
+            dates.append(key)
+            bookings_count.append(count)
+            earnings_data.append(earned)
+
         return {
             'dates': dates,
             'bookings': bookings_count,
@@ -144,4 +179,22 @@ class AnalyticsEngine:
                 }
                 for r in reviews[:5]
             ]
-        }
\ No newline at end of file
+        }
+
+
+def _invalidate_tutor_analytics(tutor_id):
+    """Drop cached analytics for a tutor after their data changes"""
+    for period in ('week', 'month', 'year'):
+        cache.delete_memoized(
+            AnalyticsEngine.get_tutor_analytics, tutor_id, period
+        )
+
+
+@event.listens_for(Booking, 'after_insert')
+def _invalidate_analytics_on_booking(mapper, connection, booking):
+    _invalidate_tutor_analytics(booking.tutor_id)
+
+
+@event.listens_for(Review, 'after_insert')
+def _invalidate_analytics_on_review(mapper, connection, review):
+    _invalidate_tutor_analytics(review.tutor_id)
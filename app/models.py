@@ -1,5 +1,6 @@
 from datetime import datetime
 from flask_login import UserMixin
+from sqlalchemy import event
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login_manager
 
@@ -25,6 +26,7 @@ class User(db.Model, UserMixin):
     user_type = db.Column(db.String(20), nullable=False)  # student | tutor | parent
 
     profile_picture = db.Column(db.String(200), default="default-avatar.png")
+    device_token = db.Column(db.String(255))  # FCM push-notification target
     is_active = db.Column(db.Boolean, default=True)
     is_verified = db.Column(db.Boolean, default=False)
 
@@ -112,8 +114,13 @@ class Tutor(db.Model):
     teaching_mode = db.Column(db.String(50), nullable=False)
     bio = db.Column(db.Text, nullable=False)
 
+    # rating/total_ratings are denormalized from reviews and
+    # completed_sessions from bookings (see event listeners below) so
+    # dashboard metrics read counters instead of scanning those tables
     rating = db.Column(db.Float, default=0.0)
     total_ratings = db.Column(db.Integer, default=0)
+    rating_sum = db.Column(db.Float, default=0.0)
+    completed_sessions = db.Column(db.Integer, default=0)
 
     is_featured = db.Column(db.Boolean, default=False)
     is_available = db.Column(db.Boolean, default=True)
@@ -161,6 +168,14 @@ class Tutor(db.Model):
 class Booking(db.Model):
     __tablename__ = "bookings"
 
+    # Composite indexes backing the mobile booking list: per-party
+    # pages ordered by recency, plus the schedule-date range filter
+    __table_args__ = (
+        db.Index("ix_bookings_student_created", "student_id", "created_at", "id"),
+        db.Index("ix_bookings_tutor_created", "tutor_id", "created_at", "id"),
+        db.Index("ix_bookings_schedule_date", "schedule_date"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
     student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -172,6 +187,9 @@ class Booking(db.Model):
 
     schedule_date = db.Column(db.Date, nullable=False)
     schedule_time = db.Column(db.String(50), nullable=False)
+    # Materialized combine(schedule_date, schedule_time); saves the
+    # per-read parse and makes "upcoming sessions" queries indexable
+    session_datetime = db.Column(db.DateTime, index=True)
 
     status = db.Column(db.String(20), default="pending")
     payment_status = db.Column(db.String(20), default="pending")
@@ -209,6 +227,30 @@ class Booking(db.Model):
         return f"<Booking {self.id}>"
 
 
+# =========================
+# BOOKING EVENT
+# =========================
+class BookingEvent(db.Model):
+    """Append-only record of a booking transition, read back as the
+    timeline with one indexed SELECT instead of polling columns."""
+
+    __tablename__ = "booking_events"
+    __table_args__ = (
+        db.Index("ix_booking_events_booking_ts", "booking_id", "ts"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    booking_id = db.Column(db.Integer, db.ForeignKey("bookings.id"), nullable=False)
+
+    event_type = db.Column(db.String(50), nullable=False)
+    ts = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    actor = db.Column(db.String(100))
+    metadata_json = db.Column(db.Text)
+
+    def __repr__(self):
+        return f"<BookingEvent {self.event_type} booking={self.booking_id}>"
+
+
 # =========================
 # REVIEW
 # =========================
@@ -233,6 +275,35 @@ class Review(db.Model):
         return f"<Review {self.id}>"
 
 
+@event.listens_for(Review, "after_insert")
+def _bump_tutor_rating(mapper, connection, review):
+    """Maintain the denormalized rating counters on Tutor"""
+    tutors = Tutor.__table__
+    connection.execute(
+        tutors.update()
+        .where(tutors.c.id == review.tutor_id)
+        .values(
+            rating_sum=tutors.c.rating_sum + review.rating,
+            total_ratings=tutors.c.total_ratings + 1,
+            rating=(tutors.c.rating_sum + review.rating)
+            / (tutors.c.total_ratings + 1),
+        )
+    )
+
+
+@event.listens_for(Booking, "after_update")
+def _bump_tutor_completed_sessions(mapper, connection, booking):
+    """Count completed sessions on Tutor when a booking transitions"""
+    history = db.inspect(booking).attrs.status.history
+    if history.has_changes() and booking.status == "completed":
+        tutors = Tutor.__table__
+        connection.execute(
+            tutors.update()
+            .where(tutors.c.id == booking.tutor_id)
+            .values(completed_sessions=tutors.c.completed_sessions + 1)
+        )
+
+
 # =========================
 # MESSAGE
 # =========================
@@ -278,6 +349,7 @@ class Payment(db.Model):
 
     amount = db.Column(db.Float, nullable=False)
     mpesa_code = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default="pending")
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -183,6 +183,21 @@ class MpesaService:
             booking.payment_status = 'paid'
             booking.status = 'confirmed'
             
+            # Record the transition for the booking timeline
+            from app.models import BookingEvent
+            import json as _json
+            db.session.add(BookingEvent(
+                booking_id=booking.id,
+                event_type='payment_completed',
+                metadata_json=_json.dumps({
+                    'description': f'Payment of KES {booking.total_amount} completed',
+                    'details': {
+                        'mpesa_receipt': mpesa_receipt,
+                        'phone': phone_number
+                    }
+                })
+            ))
+            
             # Send notifications
             from app.notifications import NotificationService
             NotificationService.send_payment_success_notification(booking)
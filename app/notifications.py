@@ -1,6 +1,12 @@
 import requests
 import json
-from flask import current_app
+from flask import current_app, render_template
+from app import celery
+
+# One pooled session per process: keep-alive connections to FCM and
+# Africa's Talking amortize the TLS handshake across sends instead of
+# paying it on every notification
+_http = requests.Session()
 
 class PushNotificationService:
     @staticmethod
@@ -33,10 +39,11 @@ class PushNotificationService:
         }
         
         try:
-            response = requests.post(
+            response = _http.post(
                 'https://fcm.googleapis.com/fcm/send',
                 headers=headers,
-                json=payload
+                json=payload,
+                timeout=10
             )
             return response.status_code == 200
         except Exception as e:
@@ -66,10 +73,11 @@ class PushNotificationService:
         }
         
         try:
-            response = requests.post(
+            response = _http.post(
                 'https://api.africastalking.com/version1/messaging',
                 headers=headers,
-                data=data
+                data=data,
+                timeout=10
             )
             return response.status_code == 201
         except Exception as e:
@@ -93,4 +101,26 @@ class PushNotificationService:
             return True
         except Exception as e:
             print(f"Email error: {e}")
-            return False
\ No newline at end of file
+            return False
+
+# Celery wrappers so request handlers can queue sends instead of
+# waiting on external APIs (FCM/SMS/SMTP all have multi-second tails)
+
+@celery.task(name='notifications.send_fcm', autoretry_for=(Exception,),
+             retry_backoff=True, max_retries=5)
+def send_fcm_task(device_token, title, body, data=None):
+    return PushNotificationService.send_fcm_notification(device_token, title, body, data)
+
+
+@celery.task(name='notifications.send_sms', autoretry_for=(Exception,),
+             retry_backoff=True, max_retries=5)
+def send_sms_task(phone_number, message):
+    return PushNotificationService.send_sms_notification(phone_number, message)
+
+
+@celery.task(name='notifications.send_email', autoretry_for=(Exception,),
+             retry_backoff=True, max_retries=5)
+def send_email_task(to_email, subject, template_name, context):
+    return PushNotificationService.send_email_notification(
+        to_email, subject, template_name, context
+    )
@@ -1,5 +1,7 @@
+import base64
 import os
 import secrets
+from io import BytesIO
 from PIL import Image
 from flask import current_app, url_for
 from functools import wraps
@@ -22,6 +24,37 @@ def save_picture(form_picture):
     return picture_fn
 
 
+# Magic bytes for the formats mobile clients actually send; checking
+# these rejects junk payloads before Pillow spends time decoding them
+_IMAGE_MAGIC = (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n", b"GIF8", b"RIFF")
+
+
+def save_base64_image(b64_data, user_id):
+    """Save a base64-encoded profile picture, resized like uploads"""
+    try:
+        if "," in b64_data:
+            # Strip a data-URI prefix like "data:image/png;base64,"
+            b64_data = b64_data.partition(",")[2]
+        raw = base64.b64decode(b64_data)
+    except (ValueError, TypeError):
+        return None
+
+    if not raw.startswith(_IMAGE_MAGIC):
+        return None
+
+    picture_fn = f"user_{user_id}_{secrets.token_hex(8)}.jpg"
+    picture_path = os.path.join(current_app.root_path, "static/uploads", picture_fn)
+
+    try:
+        i = Image.open(BytesIO(raw))
+        i.thumbnail((300, 300))
+        i.convert("RGB").save(picture_path, "JPEG")
+    except OSError:
+        return None
+
+    return picture_fn
+
+
 def send_reset_email(user):
     """Send password reset email (placeholder)"""
     # In production, integrate with email service like SendGrid
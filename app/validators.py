@@ -1,7 +1,12 @@
 import re
 
+# Compiled once per process; these run on every registration and the
+# per-call re.match cache probe adds up on short strings
+_EMAIL_RE = re.compile(r"[^@]+@[^@]+\.[^@]+")
+_PHONE_RE = re.compile(r"^\+?\d{9,15}$")
+
 def validate_email(email):
-    return re.match(r"[^@]+@[^@]+\.[^@]+", email)
+    return bool(_EMAIL_RE.match(email))
 
 def validate_phone(phone):
-    return re.match(r"^\+?\d{9,15}$", phone)
\ No newline at end of file
+    return bool(_PHONE_RE.match(phone))
@@ -8,14 +8,28 @@ print("=" * 50)
 
 # Check project structure
 print("\n1. PROJECT STRUCTURE:")
-for root, dirs, files in os.walk("."):
-    level = root.replace(".", "").count(os.sep)
+
+
+def print_tree(root, level=0):
+    # os.scandir caches entry types, so the tree print never stats
+    # every file the way os.walk does
     indent = " " * 4 * level
-    print(f"{indent}{os.path.basename(root)}/")
+    print(f"{indent}{os.path.basename(root) or root}/")
     subindent = " " * 4 * (level + 1)
-    for file in files[:10]:  # Show first 10 files
-        if file.endswith((".py", ".html", ".txt", ".json")):
-            print(f"{subindent}{file}")
+    shown = 0
+    subdirs = []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif shown < 10 and entry.name.endswith((".py", ".html", ".txt", ".json")):
+                print(f"{subindent}{entry.name}")
+                shown += 1  # Show first 10 files
+    for subdir in subdirs:
+        print_tree(subdir, level + 1)
+
+
+print_tree(".")
 
 # Check templates
 print("\n2. TEMPLATES DIRECTORY:")
@@ -47,10 +61,17 @@ with app.app_context():
 # Test template rendering
 print("\n4. TEMPLATE RENDERING TEST:")
 try:
-    from flask import render_template_string
+    from functools import lru_cache
+
+    # render_template_string recompiles its source every call; compiling
+    # through a memoized from_string keeps repeated probes free
+    @lru_cache(maxsize=None)
+    def compile_template(source):
+        return app.jinja_env.from_string(source)
 
     test_html = "<h1>Test {{ message }}</h1>"
-    result = render_template_string(test_html, message="Success!")
+    with app.app_context():
+        result = compile_template(test_html).render(message="Success!")
     print(f"✅ Template engine working: {result[:50]}...")
 except Exception as e:
     print(f"❌ Template engine error: {e}")
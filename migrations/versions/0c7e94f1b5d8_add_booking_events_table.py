@@ -0,0 +1,38 @@
+"""Add append-only booking_events table for timelines
+
+Revision ID: 0c7e94f1b5d8
+Revises: a9e5d83c7f12
+Create Date: 2026-08-29 18:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c7e94f1b5d8'
+down_revision = 'a9e5d83c7f12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'booking_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('booking_id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('ts', sa.DateTime(), nullable=False),
+        sa.Column('actor', sa.String(length=100), nullable=True),
+        sa.Column('metadata_json', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['booking_id'], ['bookings.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_booking_events_booking_ts', 'booking_events', ['booking_id', 'ts']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_booking_events_booking_ts', table_name='booking_events')
+    op.drop_table('booking_events')
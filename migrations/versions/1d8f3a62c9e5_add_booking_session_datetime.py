@@ -0,0 +1,53 @@
+"""Add materialized session_datetime to bookings
+
+Revision ID: 1d8f3a62c9e5
+Revises: 0c7e94f1b5d8
+Create Date: 2026-08-29 18:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1d8f3a62c9e5'
+down_revision = '0c7e94f1b5d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'bookings', sa.Column('session_datetime', sa.DateTime(), nullable=True)
+    )
+    # Backfill from the existing date + 'HH:MM' string pair. The cast
+    # tolerates unpadded hours like '9:00' but is Postgres syntax, so
+    # other dialects fall back to a row-by-row backfill in Python.
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute(
+            "UPDATE bookings "
+            "SET session_datetime = schedule_date + schedule_time::time"
+        )
+    else:
+        rows = bind.execute(
+            sa.text("SELECT id, schedule_date, schedule_time FROM bookings")
+        ).fetchall()
+        update = sa.text(
+            "UPDATE bookings SET session_datetime = :dt WHERE id = :id"
+        )
+        for row_id, date_part, time_part in rows:
+            try:
+                hour, minute = str(time_part).split(':')[:2]
+                dt = f"{date_part} {int(hour):02d}:{int(minute):02d}:00"
+            except (ValueError, TypeError):
+                continue
+            bind.execute(update, {'dt': dt, 'id': row_id})
+    op.create_index(
+        'ix_bookings_session_datetime', 'bookings', ['session_datetime']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_bookings_session_datetime', table_name='bookings')
+    op.drop_column('bookings', 'session_datetime')
@@ -0,0 +1,28 @@
+"""Add device_token to users
+
+Revision ID: 2e6b91d4f7a3
+Revises: 1d8f3a62c9e5
+Create Date: 2026-08-29 19:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e6b91d4f7a3'
+down_revision = '1d8f3a62c9e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The push-notification paths have always read and written this
+    # field; it is persisted as a real column from here on.
+    op.add_column(
+        'users', sa.Column('device_token', sa.String(length=255), nullable=True)
+    )
+
+
+def downgrade():
+    op.drop_column('users', 'device_token')
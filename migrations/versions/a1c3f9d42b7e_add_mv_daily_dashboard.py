@@ -0,0 +1,65 @@
+"""Add mv_daily_dashboard materialized view
+
+Revision ID: a1c3f9d42b7e
+Revises:
+Create Date: 2026-08-29 10:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c3f9d42b7e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The payment handlers have always set payment.status; persist it as
+    # a real column so the view (and the dashboard aggregates) can
+    # filter on it.
+    op.add_column(
+        'payments', sa.Column('status', sa.String(length=20), nullable=True)
+    )
+
+    # Materialized views are Postgres-only; the SQLite dev fallback keeps
+    # using live aggregation in get_chart_data.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("""
+        CREATE MATERIALIZED VIEW mv_daily_dashboard AS
+        SELECT day,
+               COUNT(*) FILTER (WHERE tbl = 'booking') AS bookings,
+               COALESCE(SUM(amount) FILTER (WHERE tbl = 'payment'), 0) AS revenue,
+               COUNT(*) FILTER (WHERE tbl = 'user') AS users
+        FROM (
+            SELECT date_trunc('day', created_at) AS day,
+                   'booking' AS tbl,
+                   NULL::double precision AS amount
+            FROM bookings
+            UNION ALL
+            SELECT date_trunc('day', created_at), 'payment', amount
+            FROM payments
+            WHERE status = 'completed'
+            UNION ALL
+            SELECT date_trunc('day', created_at), 'user', NULL
+            FROM users
+        ) events
+        GROUP BY day
+    """)
+
+    # Unique index required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.execute(
+        "CREATE UNIQUE INDEX ix_mv_daily_dashboard_day "
+        "ON mv_daily_dashboard (day)"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP MATERIALIZED VIEW IF EXISTS mv_daily_dashboard")
+
+    op.drop_column('payments', 'status')
@@ -0,0 +1,26 @@
+"""Add index for the booking schedule-date range filter
+
+Revision ID: a9e5d83c7f12
+Revises: f2b9c61d8a34
+Create Date: 2026-08-29 17:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9e5d83c7f12'
+down_revision = 'f2b9c61d8a34'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The per-party composite indexes landed in f2b9c61d8a34; this
+    # covers the date_from/date_to range filter on the booking list.
+    op.create_index('ix_bookings_schedule_date', 'bookings', ['schedule_date'])
+
+
+def downgrade():
+    op.drop_index('ix_bookings_schedule_date', table_name='bookings')
@@ -0,0 +1,48 @@
+"""Add denormalized rating/session counters to tutors
+
+Revision ID: b7e21d90c4f3
+Revises: a1c3f9d42b7e
+Create Date: 2026-08-29 10:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e21d90c4f3'
+down_revision = 'a1c3f9d42b7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'tutors',
+        sa.Column('rating_sum', sa.Float(), nullable=True, server_default='0'),
+    )
+    op.add_column(
+        'tutors',
+        sa.Column(
+            'completed_sessions', sa.Integer(), nullable=True, server_default='0'
+        ),
+    )
+
+    # Backfill the counters from existing reviews and bookings
+    op.execute("""
+        UPDATE tutors SET rating_sum = COALESCE(
+            (SELECT SUM(rating) FROM reviews WHERE reviews.tutor_id = tutors.id), 0
+        )
+    """)
+    op.execute("""
+        UPDATE tutors SET completed_sessions = COALESCE(
+            (SELECT COUNT(*) FROM bookings
+             WHERE bookings.tutor_id = tutors.id
+               AND bookings.status = 'completed'), 0
+        )
+    """)
+
+
+def downgrade():
+    op.drop_column('tutors', 'completed_sessions')
+    op.drop_column('tutors', 'rating_sum')
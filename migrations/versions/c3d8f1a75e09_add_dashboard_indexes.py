@@ -0,0 +1,44 @@
+"""Add composite indexes for dashboard hot paths
+
+Revision ID: c3d8f1a75e09
+Revises: b7e21d90c4f3
+Create Date: 2026-08-29 11:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d8f1a75e09'
+down_revision = 'b7e21d90c4f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Dashboard aggregates filter payments by status plus a created_at
+    # window and only read amount; INCLUDE makes it an index-only scan
+    # on Postgres (the kwarg is ignored elsewhere).
+    op.create_index(
+        'ix_payments_status_created_at',
+        'payments',
+        ['status', 'created_at'],
+        postgresql_include=['amount'],
+    )
+    op.create_index(
+        'ix_bookings_status_created_at',
+        'bookings',
+        ['status', 'created_at'],
+    )
+    op.create_index(
+        'ix_users_created_at',
+        'users',
+        ['created_at'],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_users_created_at', table_name='users')
+    op.drop_index('ix_bookings_status_created_at', table_name='bookings')
+    op.drop_index('ix_payments_status_created_at', table_name='payments')
@@ -0,0 +1,41 @@
+"""Add partial indexes for skewed categorical counts
+
+Revision ID: d4f2c6b8a1e7
+Revises: c3d8f1a75e09
+Create Date: 2026-08-29 11:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f2c6b8a1e7'
+down_revision = 'c3d8f1a75e09'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Admins and parents are tiny minorities of the users table; partial
+    # indexes let Postgres answer the user-management filters with an
+    # index-only scan of a few KB instead of a heap scan. (These back
+    # the /admin/users user_type filters - the dashboard aggregates no
+    # longer count these types directly.)
+    op.create_index(
+        'ix_users_admin',
+        'users',
+        ['id'],
+        postgresql_where=sa.text("user_type = 'admin'"),
+    )
+    op.create_index(
+        'ix_users_parent',
+        'users',
+        ['id'],
+        postgresql_where=sa.text("user_type = 'parent'"),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_users_parent', table_name='users')
+    op.drop_index('ix_users_admin', table_name='users')
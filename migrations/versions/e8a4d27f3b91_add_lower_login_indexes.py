@@ -0,0 +1,37 @@
+"""Add lower() expression indexes for login lookups
+
+Revision ID: e8a4d27f3b91
+Revises: d4f2c6b8a1e7
+Create Date: 2026-08-29 16:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a4d27f3b91'
+down_revision = 'd4f2c6b8a1e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Login compares lower(email)/lower(username) so case variants of
+    # the same identifier resolve to one account; these expression
+    # indexes keep each lookup an index seek instead of a seq scan.
+    # They are unique so case variants cannot register as separate
+    # accounts either.
+    op.create_index(
+        'ix_users_email_lower', 'users', [sa.text('lower(email)')],
+        unique=True,
+    )
+    op.create_index(
+        'ix_users_username_lower', 'users', [sa.text('lower(username)')],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_users_username_lower', table_name='users')
+    op.drop_index('ix_users_email_lower', table_name='users')
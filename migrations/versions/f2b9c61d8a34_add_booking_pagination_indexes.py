@@ -0,0 +1,37 @@
+"""Add composite indexes for booking keyset pagination
+
+Revision ID: f2b9c61d8a34
+Revises: e8a4d27f3b91
+Create Date: 2026-08-29 17:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b9c61d8a34'
+down_revision = 'e8a4d27f3b91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The booking list orders by (created_at DESC, id DESC) within one
+    # party; Postgres serves that from these ascending indexes with a
+    # backward scan, so each page is a single index seek.
+    op.create_index(
+        'ix_bookings_student_created',
+        'bookings',
+        ['student_id', 'created_at', 'id'],
+    )
+    op.create_index(
+        'ix_bookings_tutor_created',
+        'bookings',
+        ['tutor_id', 'created_at', 'id'],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_bookings_tutor_created', table_name='bookings')
+    op.drop_index('ix_bookings_student_created', table_name='bookings')
@@ -3,23 +3,164 @@ from flask_jwt_extended import (
     create_access_token, create_refresh_token, 
     jwt_required, get_jwt_identity, get_jwt
 )
-from app import db
+from app import celery, db, redis_client, jwt as jwt_manager
+from sqlalchemy import func, update
+from sqlalchemy.orm import selectinload
+from sqlalchemy.exc import IntegrityError
 from app.models import User, Tutor
 from app.validators import validate_email, validate_phone
-from app.notifications import PushNotificationService
+from app.utils import save_base64_image
+from app.notifications import send_fcm_task, send_sms_task, send_email_task
+from werkzeug.security import generate_password_hash, check_password_hash
+from concurrent.futures import ProcessPoolExecutor
 import jwt
 import datetime
 import hashlib
+import hmac
+import os
+import threading
+import time
 
 mobile_auth = Blueprint('mobile_auth', __name__)
 
-# Token blocklist for logout
-token_blocklist = set()
+# Revoked JWTs live in Redis keyed by jti with a TTL matching the token
+# expiry, so the blocklist is shared across workers and never grows
+# unbounded (the old per-process set() was neither)
+# First-level in-process cache in front of the Redis probe: almost no
+# tokens are ever revoked, so most requests skip the network round-trip.
+# Verdicts expire after a few seconds, bounding how long a token revoked
+# by another worker can still be honored here.
+_blocklist_cache = {}
+_blocklist_cache_lock = threading.Lock()
+_BLOCKLIST_CACHE_TTL = 5
+_BLOCKLIST_CACHE_MAX = 10000
+
+@jwt_manager.token_in_blocklist_loader
+def check_token_revoked(jwt_header, jwt_payload):
+    jti = jwt_payload['jti']
+    now = time.monotonic()
+    
+    hit = _blocklist_cache.get(jti)
+    if hit is not None and hit[1] > now:
+        return hit[0]
+    
+    revoked = bool(redis_client.exists(f"jti:{jti}"))
+    # gthread workers share this dict; the lock keeps the size check
+    # and clear/insert pair coherent under concurrent misses
+    with _blocklist_cache_lock:
+        if len(_blocklist_cache) >= _BLOCKLIST_CACHE_MAX:
+            _blocklist_cache.clear()
+        _blocklist_cache[jti] = (revoked, now + _BLOCKLIST_CACHE_TTL)
+    return revoked
+
+# PyJWT re-encodes a str secret to bytes on every encode/decode; hand
+# it pre-encoded bytes cached per secret so key prep happens once per
+# process instead of per reset token
+_jwt_key_cache = {}
+
+def _jwt_key():
+    secret = current_app.config['SECRET_KEY']
+    key = _jwt_key_cache.get(secret)
+    if key is None:
+        key = secret.encode() if isinstance(secret, str) else secret
+        _jwt_key_cache[secret] = key
+    return key
+
+# Auth payloads are tiny; reject oversized bodies before the JSON
+# parser buffers them into memory (profile-picture uploads go through
+# /profile/update, which keeps the app-wide limit)
+AUTH_MAX_CONTENT_LENGTH = 16 * 1024
+
+def _password_version(password_hash):
+    """Short hash of the password hash, carried as a JWT claim.
+
+    Lets refresh verify the password hasn't rotated since login without
+    loading the user row; bumped in Redis whenever the password changes.
+    """
+    return hashlib.blake2b(password_hash.encode(), digest_size=4).hexdigest()
+
+def _issue_tokens(user):
+    """Mint the access/refresh pair with the account-state claims.
+
+    user_type/tutor_id ride along so authorization branches (e.g. the
+    booking list) can read them from the token instead of the database.
+    """
+    tutor = user.tutor_profile
+    claims = {
+        'act': user.is_active,
+        'pwv': _password_version(user.password_hash),
+        'user_type': user.user_type,
+        'tutor_id': tutor.id if tutor else None,
+    }
+    redis_client.setex(f"pwv:{user.id}", 86400, claims['pwv'])
+    return (
+        create_access_token(identity=user.id, additional_claims=claims),
+        create_refresh_token(identity=user.id, additional_claims=claims),
+    )
+
+def _now():
+    """Epoch seconds; one clock read, no datetime allocation"""
+    return int(time.time())
+
+# Token metadata never varies per request; build it once and spread it
+_TOKEN_CONST = {'token_type': 'bearer', 'expires_in': 3600}  # 1 hour
+
+def serialize_user(user):
+    """Common user fields shared by the auth responses.
+
+    Centralizing field selection keeps newly added model columns from
+    leaking into API payloads; callers spread in their extras.
+    """
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'phone': user.phone,
+        'user_type': user.user_type,
+        'profile_picture': user.profile_picture,
+        'is_verified': user.is_verified
+    }
+
+def get_auth_json():
+    """Parse the request body, bounded and without raising on bad JSON"""
+    if request.content_length and request.content_length > AUTH_MAX_CONTENT_LENGTH:
+        return None
+    return request.get_json(silent=True)
+
+# Password hashing is deliberately slow; running it on the request
+# thread pins a gunicorn gthread worker for the whole hash. The pool is
+# created lazily so each worker process builds its own instead of
+# inheriting a forked, unusable one from the master.
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+def _get_hash_pool():
+    global _hash_pool
+    if _hash_pool is None:
+        with _hash_pool_lock:
+            if _hash_pool is None:
+                _hash_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _hash_pool
+
+def hash_password(password):
+    """Compute the password hash in the worker pool"""
+    return _get_hash_pool().submit(generate_password_hash, password).result()
+
+def verify_password(password_hash, password):
+    """Check a password against its hash in the worker pool"""
+    return _get_hash_pool().submit(
+        check_password_hash, password_hash, password
+    ).result()
 
 @mobile_auth.route('/register', methods=['POST'])
 def mobile_register():
     """Mobile user registration"""
-    data = request.get_json()
+    data = get_auth_json()
+    if data is None:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid or oversized request body'
+        }), 400
     
     # Validation
     required_fields = ['email', 'phone', 'password', 'user_type', 'username']
@@ -44,14 +185,28 @@ def mobile_register():
             'error': 'Invalid phone number. Use format: 0712 345 678'
         }), 400
     
-    # Check if user exists
-    if User.query.filter_by(email=data['email']).first():
+    # Fail fast before paying for the password hash (mirrors the check
+    # in reset_password)
+    if len(data['password']) < 6:
         return jsonify({
             'success': False,
-            'error': 'Email already registered'
-        }), 409
+            'error': 'Password must be at least 6 characters'
+        }), 400
     
-    if User.query.filter_by(username=data['username']).first():
+    # Check if user exists - one round-trip covers both uniqueness
+    # checks, case-insensitively to match the login lookups
+    email_lower = data['email'].strip().lower()
+    username_lower = data['username'].strip().lower()
+    existing = db.session.query(User.email, User.username).filter(
+        (func.lower(User.email) == email_lower)
+        | (func.lower(User.username) == username_lower)
+    ).first()
+    if existing:
+        if existing.email.lower() == email_lower:
+            return jsonify({
+                'success': False,
+                'error': 'Email already registered'
+            }), 409
         return jsonify({
             'success': False,
             'error': 'Username already taken'
@@ -65,7 +220,7 @@ def mobile_register():
         location=data.get('location', 'Nairobi'),
         user_type=data['user_type']
     )
-    user.set_password(data['password'])
+    user.password_hash = hash_password(data['password'])
     
     # Device token for push notifications
     device_token = data.get('device_token')
@@ -73,29 +228,42 @@ def mobile_register():
         user.device_token = device_token
     
     db.session.add(user)
-    db.session.commit()
-    
-    # If registering as tutor, create tutor profile
-    if data['user_type'] == 'tutor':
-        tutor = Tutor(
-            user_id=user.id,
-            full_name=data.get('full_name', user.username),
-            qualifications=data.get('qualifications', ''),
-            subjects=data.get('subjects', ''),
-            hourly_rate=data.get('hourly_rate', 500),
-            level=data.get('level', 'secondary'),
-            experience_years=data.get('experience_years', 0),
-            teaching_mode=data.get('teaching_mode', 'both')
-        )
-        db.session.add(tutor)
+    try:
+        # flush assigns user.id without a second commit; the tutor
+        # profile lands in the same transaction, so registration costs
+        # one fsync instead of two
+        db.session.flush()
+        
+        # If registering as tutor, create tutor profile
+        if data['user_type'] == 'tutor':
+            tutor = Tutor(
+                user_id=user.id,
+                full_name=data.get('full_name', user.username),
+                qualifications=data.get('qualifications', ''),
+                subjects=data.get('subjects', ''),
+                hourly_rate=data.get('hourly_rate', 500),
+                level=data.get('level', 'secondary'),
+                experience_years=data.get('experience_years', 0),
+                teaching_mode=data.get('teaching_mode', 'both')
+            )
+            db.session.add(tutor)
+        
         db.session.commit()
+    except IntegrityError:
+        # Race guard: a concurrent registration can slip between the
+        # existence check and the commit; the unique constraints on
+        # email/username are the source of truth
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Email or username already registered'
+        }), 409
     
     # Generate JWT tokens
-    access_token = create_access_token(identity=user.id)
-    refresh_token = create_refresh_token(identity=user.id)
+    access_token, refresh_token = _issue_tokens(user)
     
-    # Send welcome notification
-    PushNotificationService.send_fcm_notification(
+    # Send welcome notification off the request path
+    send_fcm_task.delay(
         device_token,
         'Welcome to EduTutor Kenya! 🎓',
         f'Hi {user.username}, your account has been created successfully!'
@@ -104,27 +272,23 @@ def mobile_register():
     return jsonify({
         'success': True,
         'message': 'Registration successful',
-        'user': {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'phone': user.phone,
-            'user_type': user.user_type,
-            'profile_picture': user.profile_picture,
-            'is_verified': user.is_verified
-        },
+        'user': serialize_user(user),
         'tokens': {
+            **_TOKEN_CONST,
             'access_token': access_token,
-            'refresh_token': refresh_token,
-            'token_type': 'bearer',
-            'expires_in': 3600  # 1 hour
+            'refresh_token': refresh_token
         }
     }), 201
 
 @mobile_auth.route('/login', methods=['POST'])
 def mobile_login():
     """Mobile user login"""
-    data = request.get_json()
+    data = get_auth_json()
+    if data is None:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid or oversized request body'
+        }), 400
     
     # Accept email or username
     identifier = data.get('email') or data.get('username')
@@ -137,12 +301,17 @@ def mobile_login():
             'error': 'Email/username and password required'
         }), 400
     
-    # Find user by email or username
-    user = User.query.filter(
-        (User.email == identifier) | (User.username == identifier)
-    ).first()
-    
-    if not user or not user.check_password(password):
+    # Two short-circuited index seeks instead of an OR the planner
+    # tends to answer with a seq scan; comparing on lower() hits the
+    # expression indexes and collapses case variants of the same
+    # address. The tutor profile rides along in the same round-trip.
+    identifier = identifier.strip().lower()
+    base = User.query.options(selectinload(User.tutor_profile))
+    user = base.filter(func.lower(User.email) == identifier).first()
+    if user is None:
+        user = base.filter(func.lower(User.username) == identifier).first()
+    
+    if not user or not verify_password(user.password_hash, password):
         return jsonify({
             'success': False,
             'error': 'Invalid credentials'
@@ -159,18 +328,17 @@ def mobile_login():
         user.device_token = device_token
         db.session.commit()
     
-    # Update last login
-    user.last_login = datetime.datetime.utcnow()
-    db.session.commit()
+    # Record last login in Redis; flush_last_logins coalesces these
+    # into one bulk UPDATE instead of an UPDATE+COMMIT per login
+    redis_client.hset('last_login_pending', user.id, int(time.time()))
     
     # Generate tokens
-    access_token = create_access_token(identity=user.id)
-    refresh_token = create_refresh_token(identity=user.id)
+    access_token, refresh_token = _issue_tokens(user)
     
     # Get tutor info if applicable
     tutor_info = None
     if user.user_type == 'tutor':
-        tutor = Tutor.query.filter_by(user_id=user.id).first()
+        tutor = user.tutor_profile
         if tutor:
             tutor_info = {
                 'tutor_id': tutor.id,
@@ -184,30 +352,60 @@ def mobile_login():
     return jsonify({
         'success': True,
         'message': 'Login successful',
-        'user': {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'phone': user.phone,
-            'user_type': user.user_type,
-            'profile_picture': user.profile_picture,
-            'location': user.location,
-            'is_verified': user.is_verified
-        },
+        'user': {**serialize_user(user), 'location': user.location},
         'tutor_info': tutor_info,
         'tokens': {
+            **_TOKEN_CONST,
             'access_token': access_token,
-            'refresh_token': refresh_token,
-            'token_type': 'bearer',
-            'expires_in': 3600
+            'refresh_token': refresh_token
         }
     })
 
+@celery.task(name='auth.flush_last_logins')
+def flush_last_logins():
+    """Write coalesced last-login timestamps to the database"""
+    pending = redis_client.hgetall('last_login_pending')
+    if not pending:
+        return 0
+    redis_client.hdel('last_login_pending', *pending.keys())
+    
+    db.session.bulk_update_mappings(User, [
+        {
+            'id': int(user_id),
+            'last_login': datetime.datetime.utcfromtimestamp(int(timestamp)),
+        }
+        for user_id, timestamp in pending.items()
+    ])
+    db.session.commit()
+    return len(pending)
+
 @mobile_auth.route('/refresh', methods=['POST'])
 @jwt_required(refresh=True)
 def refresh_token():
     """Refresh access token"""
     current_user_id = get_jwt_identity()
+    claims = get_jwt()
+    pwv = claims.get('pwv')
+    
+    # Fast path: the refresh token carries the account-state claims
+    # minted at login; when they still match the pwv recorded in Redis
+    # the token predates no password change and the row load is skipped
+    cached_pwv = redis_client.get(f"pwv:{current_user_id}")
+    if claims.get('act') and pwv and cached_pwv and cached_pwv.decode() == pwv:
+        new_access_token = create_access_token(
+            identity=current_user_id,
+            additional_claims={
+                'act': True,
+                'pwv': pwv,
+                'user_type': claims.get('user_type'),
+                'tutor_id': claims.get('tutor_id'),
+            }
+        )
+        return jsonify({
+            'success': True,
+            'access_token': new_access_token,
+            **_TOKEN_CONST
+        })
     
     # Check if user exists and is active
     user = User.query.get(current_user_id)
@@ -217,21 +415,43 @@ def refresh_token():
             'error': 'User not found or inactive'
         }), 401
     
-    new_access_token = create_access_token(identity=current_user_id)
+    current_pwv = _password_version(user.password_hash)
+    if pwv is not None and pwv != current_pwv:
+        # Token was minted before a password change; force re-login
+        return jsonify({
+            'success': False,
+            'error': 'Token no longer valid, please log in again'
+        }), 401
+    
+    redis_client.setex(f"pwv:{user.id}", 86400, current_pwv)
+    tutor = user.tutor_profile
+    new_access_token = create_access_token(
+        identity=current_user_id,
+        additional_claims={
+            'act': user.is_active,
+            'pwv': current_pwv,
+            'user_type': user.user_type,
+            'tutor_id': tutor.id if tutor else None,
+        }
+    )
     
     return jsonify({
         'success': True,
         'access_token': new_access_token,
-        'token_type': 'bearer',
-        'expires_in': 3600
+        **_TOKEN_CONST
     })
 
 @mobile_auth.route('/logout', methods=['POST'])
 @jwt_required()
 def mobile_logout():
     """Mobile user logout"""
-    jti = get_jwt()['jti']
-    token_blocklist.add(jti)
+    payload = get_jwt()
+    ttl = payload['exp'] - int(time.time())
+    if ttl > 0:
+        redis_client.setex(f"jti:{payload['jti']}", ttl, 1)
+        # Revocation from this worker takes effect locally right away
+        with _blocklist_cache_lock:
+            _blocklist_cache[payload['jti']] = (True, time.monotonic() + ttl)
     
     # Clear device token
     user_id = get_jwt_identity()
@@ -248,7 +468,12 @@ def mobile_logout():
 @mobile_auth.route('/forgot-password', methods=['POST'])
 def forgot_password():
     """Request password reset"""
-    data = request.get_json()
+    data = get_auth_json()
+    if data is None:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid or oversized request body'
+        }), 400
     email = data.get('email')
     
     if not email:
@@ -265,22 +490,24 @@ def forgot_password():
             'message': 'If the email exists, you will receive reset instructions'
         })
     
-    # Generate reset token (valid for 1 hour)
+    # Generate reset token (valid for 1 hour); one clock read feeds
+    # both the JWT exp claim and the stored expiry
+    expires_at = _now() + 3600
     reset_token = jwt.encode({
         'user_id': user.id,
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1),
+        'exp': expires_at,
         'type': 'password_reset'
-    }, current_app.config['SECRET_KEY'], algorithm='HS256')
+    }, _jwt_key(), algorithm='HS256')
     
     # Save reset token to user
     user.reset_token = reset_token
-    user.reset_token_expiry = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    user.reset_token_expiry = expires_at
     db.session.commit()
     
     # Send reset email
     reset_link = f"{current_app.config['MOBILE_APP_URL']}/reset-password?token={reset_token}"
     
-    PushNotificationService.send_email_notification(
+    send_email_task.delay(
         user.email,
         'Password Reset Request',
         'password_reset',
@@ -292,7 +519,7 @@ def forgot_password():
     )
     
     # Also send SMS if enabled
-    PushNotificationService.send_sms_notification(
+    send_sms_task.delay(
         user.phone,
         f'EduTutor Kenya: Password reset requested. Use token: {reset_token[:6]}...'
     )
@@ -305,7 +532,12 @@ def forgot_password():
 @mobile_auth.route('/reset-password', methods=['POST'])
 def reset_password():
     """Reset password with token"""
-    data = request.get_json()
+    data = get_auth_json()
+    if data is None:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid or oversized request body'
+        }), 400
     token = data.get('token')
     new_password = data.get('new_password')
     
@@ -325,7 +557,7 @@ def reset_password():
         # Verify token
         payload = jwt.decode(
             token, 
-            current_app.config['SECRET_KEY'], 
+            _jwt_key(), 
             algorithms=['HS256']
         )
         
@@ -338,26 +570,34 @@ def reset_password():
         user_id = payload.get('user_id')
         user = User.query.get(user_id)
         
-        if not user or user.reset_token != token:
+        # compare_digest keeps the token check constant-time so the
+        # comparison can't leak a byte-by-byte timing oracle
+        if not user or not user.reset_token or not hmac.compare_digest(user.reset_token, token):
             return jsonify({
                 'success': False,
                 'error': 'Invalid or expired token'
             }), 400
         
-        if user.reset_token_expiry < datetime.datetime.utcnow():
+        if user.reset_token_expiry < _now():
             return jsonify({
                 'success': False,
                 'error': 'Token has expired'
             }), 400
         
         # Update password
-        user.set_password(new_password)
+        user.password_hash = hash_password(new_password)
         user.reset_token = None
         user.reset_token_expiry = None
         db.session.commit()
         
+        # Bump the cached password version so outstanding refresh
+        # tokens from before the change stop short-circuiting the DB
+        redis_client.setex(
+            f"pwv:{user.id}", 86400, _password_version(user.password_hash)
+        )
+        
         # Send confirmation
-        PushNotificationService.send_fcm_notification(
+        send_fcm_task.delay(
             user.device_token,
             'Password Changed',
             'Your password has been changed successfully'
@@ -384,7 +624,16 @@ def reset_password():
 def get_profile():
     """Get user profile"""
     user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    
+    # Serve the serialized profile straight from Redis when fresh; the
+    # mobile app polls this endpoint, making it the hottest
+    # authenticated read in the module
+    cache_key = f'profile:{user_id}'
+    cached = redis_client.get(cache_key)
+    if cached:
+        return current_app.response_class(cached, mimetype='application/json')
+    
+    user = User.query.options(selectinload(User.tutor_profile)).get(user_id)
     
     if not user:
         return jsonify({
@@ -395,7 +644,7 @@ def get_profile():
     # Get tutor info if applicable
     tutor_info = None
     if user.user_type == 'tutor':
-        tutor = Tutor.query.filter_by(user_id=user.id).first()
+        tutor = user.tutor_profile
         if tutor:
             tutor_info = {
                 'id': tutor.id,
@@ -415,23 +664,20 @@ def get_profile():
                 'is_featured': tutor.is_featured
             }
     
-    return jsonify({
+    body = current_app.json.dumps({
         'success': True,
         'profile': {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'phone': user.phone,
+            **serialize_user(user),
             'location': user.location,
-            'user_type': user.user_type,
-            'profile_picture': user.profile_picture,
             'created_at': user.created_at.isoformat(),
             'last_login': user.last_login.isoformat() if user.last_login else None,
-            'is_active': user.is_active,
-            'is_verified': user.is_verified
+            'is_active': user.is_active
         },
         'tutor_info': tutor_info
     })
+    redis_client.setex(cache_key, 60, body)
+    
+    return current_app.response_class(body, mimetype='application/json')
 
 @mobile_auth.route('/profile/update', methods=['PUT'])
 @jwt_required()
@@ -456,12 +702,12 @@ def update_profile():
     
     # Special handling for profile picture (base64)
     if 'profile_picture_base64' in data:
-        from app.utils import save_base64_image
         filename = save_base64_image(data['profile_picture_base64'], user.id)
         if filename:
             user.profile_picture = filename
     
     db.session.commit()
+    redis_client.delete(f'profile:{user_id}')
     
     return jsonify({
         'success': True,
@@ -479,19 +725,26 @@ def update_profile():
 def update_device_token():
     """Update device token for push notifications"""
     user_id = get_jwt_identity()
-    data = request.get_json()
+    data = get_auth_json()
     
-    device_token = data.get('device_token')
+    device_token = data.get('device_token') if data else None
     if not device_token:
         return jsonify({
             'success': False,
             'error': 'Device token is required'
         }), 400
     
-    user = User.query.get(user_id)
-    if user:
-        user.device_token = device_token
-        db.session.commit()
+    # One conditional UPDATE instead of hydrating the row first; the
+    # IS DISTINCT FROM guard skips the write (and its WAL) when the
+    # client re-sends the token it already has
+    result = db.session.execute(
+        update(User)
+        .where(User.id == user_id, User.device_token.is_distinct_from(device_token))
+        .values(device_token=device_token)
+    )
+    db.session.commit()
+    if result.rowcount:
+        redis_client.delete(f'profile:{user_id}')
     
     return jsonify({
         'success': True,